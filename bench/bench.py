@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Benchmark extraction, staging, packing and installing on synthetic data.
+
+    python bench/bench.py --patch-files 3000 --patch-size 200MB --mods 5 20 80
+
+Three synthetic English patch archives are written to a fake game folder and a
+set of mods is generated for each --mods count. Every phase then runs in its
+own process, with bench/fake_dscstools.py standing in for DSCSToolsCLI.exe
+unless --tool is given, and reports its wall time, the bytes it wrote to disk
+(temporary files included, hardlinks free; the kernel counts nothing on tmpfs),
+the bytes the mod loader itself copied and installed, from its own counters, and
+its peak RSS, children included.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+LANGUAGE = "English"
+# Pastas de mod e o patch sintético onde cada uma cai, como em settings.patch_map_for("English").
+FOLDER_EXTENSIONS = {"lua": "lua", "images": "img", "data": "bin", "text": "txt", "message": "mbe"}
+ARCHIVES = {"Patch_0.dx11": ("lua",), "Patch_1.dx11": ("images", "data"), "Patch_text01.dx11": ("text", "message")}
+# Contadores do Tracer que são bytes copiados pelo próprio mod loader, com ou sem tmpfs.
+COPY_COUNTERS = ("bytes copied", "bytes installed")
+PHASES = ("extract", "extract-incremental", "stage-link", "stage-copy", "pack-cold", "pack-warm", "install-cold", "install-warm")
+
+
+def parse_size(text):
+    """'64MB' -> 67108864; a plain number is bytes."""
+    text = text.strip().upper()
+    for unit, factor in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024), ("B", 1)):
+        if text.endswith(unit): return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def synthetic_data(rng, size):
+    """Bytes that compress roughly like game files: runs of repeated text mixed with noise."""
+    chunks, remaining = [], size
+    while remaining > 0:
+        n = min(remaining, rng.randint(64, 4096))
+        chunks.append(rng.randbytes(n) if rng.random() < 0.4 else (b"local value = %d\n" % rng.randint(0, 999)) * (n // 18 + 1))
+        remaining -= n
+    return b"".join(chunks)[:size]
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f: f.write(data)
+
+
+def file_sizes(rng, count, total):
+    weights = [rng.uniform(0.2, 1.8) for _ in range(count)]
+    scale = total / sum(weights)
+    return [max(1, int(w * scale)) for w in weights]
+
+
+def generate_archives(spec, log):
+    """Write the synthetic patch archives into game/gamedata and list their entries in archive_entries.json."""
+    from mvgl import create_archive
+    rng = random.Random(spec["seed"])
+    gamedata_path = os.path.join("game", "gamedata")
+    source_root = "archive_sources"
+    os.makedirs(gamedata_path, exist_ok=True)
+    entries = {}
+    sizes = file_sizes(rng, spec["patch_files"], spec["patch_size"])
+    folders = [folder for patch_folders in ARCHIVES.values() for folder in patch_folders]
+    for i, size in enumerate(sizes):
+        folder = folders[i % len(folders)]
+        entries.setdefault(folder, []).append(f"{folder}/dir{i % 32:02d}/file{i:05d}.{FOLDER_EXTENSIONS[folder]}")
+        write_file(os.path.join(source_root, *entries[folder][-1].split("/")), synthetic_data(rng, size))
+    for patch_name, patch_folders in ARCHIVES.items():
+        files = {name: os.path.join(source_root, *name.split("/")) for folder in patch_folders for name in entries.get(folder, [])}
+        stats = create_archive(files, os.path.join(gamedata_path, f"{patch_name}.mvgl"))
+        log(f"{patch_name}: {stats.entries_added} entries")
+    shutil.rmtree(source_root)
+    with open("archive_entries.json", 'w') as f: json.dump(entries, f)
+
+
+def generate_mods(spec, log):
+    """Write spec["mods"] mods; a share of each mod's files (--overlap) replace archive entries, the rest are new."""
+    rng = random.Random(spec["seed"] + spec["mods"])
+    with open("archive_entries.json", 'r') as f: entries = json.load(f)
+    if os.path.exists("Mods"): shutil.rmtree("Mods")
+    folders = sorted(entries)
+    for m in range(spec["mods"]):
+        mod_path = os.path.join("Mods", f"Mod_{m:03d}")
+        for i, size in enumerate(file_sizes(rng, spec["mod_files"], spec["mod_size"])):
+            folder = rng.choice(folders)
+            if rng.random() < spec["overlap"]: name = rng.choice(entries[folder])
+            else: name = f"{folder}/mod{m:03d}/file{i:04d}.{FOLDER_EXTENSIONS[folder]}"
+            write_file(os.path.join(mod_path, *name.split("/")), synthetic_data(rng, size))
+    log(f"{spec['mods']} mod(s) with {spec['mod_files']} file(s) each")
+
+
+def packing_plan():
+    from mod_index import ModIndex, list_mods
+    from settings import MOD_INDEX_FILE, MODS_DIR, patch_map_for
+    mod_index = ModIndex(MOD_INDEX_FILE, MODS_DIR)
+    mod_names = list_mods(MODS_DIR)
+    mod_index.refresh(mod_names)
+    mod_index.save()
+    return mod_index, mod_names, mod_index.plan(mod_names, patch_map_for(LANGUAGE))
+
+
+def phase_extract(spec, log, tracer):
+    import pipeline
+    from settings import EXTRACTED_DIR, EXTRACTED_PATCHES_DIR, EXTRACTED_STORE_DIR, BASE_ARCHIVES_DIR
+    for path in (EXTRACTED_DIR, EXTRACTED_PATCHES_DIR, EXTRACTED_STORE_DIR, BASE_ARCHIVES_DIR):
+        if os.path.exists(path): shutil.rmtree(path)
+    filenames = [f"{patch_name}.mvgl" for patch_name in ARCHIVES]
+    yield
+    jobs = pipeline.extraction_jobs(filenames, os.path.join("game", "gamedata"), incremental=False)
+    pool = pipeline.extraction_pool(jobs, spec["workers"], tracer)
+    if pipeline.run_extraction(pool, log): raise RuntimeError("extraction failed")
+    pipeline.link_extracted_patches(pipeline.extracted_patches(pool), log, tracer)
+
+
+def phase_extract_incremental(spec, log, tracer):
+    import pipeline
+    filenames = [f"{patch_name}.mvgl" for patch_name in ARCHIVES]
+    filters = {filename: {"include": "**"} for filename in filenames}
+    yield
+    jobs = pipeline.extraction_jobs(filenames, os.path.join("game", "gamedata"), filters, incremental=True)
+    if pipeline.run_extraction(pipeline.extraction_pool(jobs, spec["workers"], tracer), log): raise RuntimeError("extraction failed")
+
+
+def _phase_stage(mode):
+    def phase(spec, log, tracer):
+        from packing import stage_patch
+        from settings import EXTRACTED_PATCHES_DIR, PACKING_TEMP_DIR
+        mod_index, mod_names, plan = packing_plan()
+        if os.path.exists(PACKING_TEMP_DIR): shutil.rmtree(PACKING_TEMP_DIR)
+        yield
+        for patch_name, files in plan.items():
+            stats = stage_patch(os.path.join(EXTRACTED_PATCHES_DIR, patch_name), os.path.join(PACKING_TEMP_DIR, patch_name), files, mode, tracer)
+            log(f"{patch_name}: {stats.summary()}")
+        yield
+        shutil.rmtree(PACKING_TEMP_DIR)
+    return phase
+
+
+def _phase_pack(cold):
+    def phase(spec, log, tracer):
+        import pipeline
+        from settings import PACK_CACHE_DIR
+        if cold and os.path.exists(PACK_CACHE_DIR): shutil.rmtree(PACK_CACHE_DIR)
+        mod_index, mod_names, plan = packing_plan()
+        yield
+        pipeline.pack_mods(mod_names, LANGUAGE, mod_index, log, spec["backend"], spec["staging"], spec["workers"], tracer=tracer)
+    return phase
+
+
+def _phase_install(warm):
+    def phase(spec, log, tracer):
+        import pipeline
+        mod_index, mod_names, plan = packing_plan()
+        mvgl_files = pipeline.pack_mods(mod_names, LANGUAGE, mod_index, log, spec["backend"], spec["staging"], spec["workers"])
+        # Uma cópia do jogo, para que o Installer guarde os originais e troque os arquivos como faria no jogo de verdade.
+        game_path = "installed"
+        if not warm or not os.path.isdir(game_path):
+            if os.path.exists(game_path): shutil.rmtree(game_path)
+            shutil.copytree("game", game_path)
+        if warm: pipeline.install_packed(mvgl_files, game_path, log)
+        yield
+        pipeline.install_packed(mvgl_files, game_path, log, tracer)
+    return phase
+
+
+def phase_generate_archives(spec, log, tracer):
+    yield
+    generate_archives(spec, log)
+
+
+def phase_generate_mods(spec, log, tracer):
+    yield
+    generate_mods(spec, log)
+
+
+# Cada fase é um gerador: o que vem antes do primeiro yield é preparação, o
+# trecho até o segundo yield (ou o fim) é medido e o resto é limpeza. Só os
+# contadores do tracer somados no trecho medido entram no resultado.
+PHASE_FUNCTIONS = {
+    "generate-archives": phase_generate_archives,
+    "generate-mods": phase_generate_mods,
+    "extract": phase_extract,
+    "extract-incremental": phase_extract_incremental,
+    "stage-link": _phase_stage("link"),
+    "stage-copy": _phase_stage("copy"),
+    "pack-cold": _phase_pack(True),
+    "pack-warm": _phase_pack(False),
+    "install-cold": _phase_install(False),
+    "install-warm": _phase_install(True),
+}
+
+
+def blocks_written():
+    """Bytes written to disk so far by this process and its waited-for children, as counted by the kernel."""
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_oublock + resource.getrusage(resource.RUSAGE_CHILDREN).ru_oublock) * 512
+
+
+def peak_rss():
+    """Peak resident set size in bytes of this process and of its largest waited-for child."""
+    scale = 1 if sys.platform == "darwin" else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+
+def run_phase(name, spec):
+    """Body of a phase process: set up, measure the timed part and print the result as JSON."""
+    from tracing import Tracer
+    os.chdir(spec["workdir"])
+    log_file = open("bench.log", 'a')
+    def log(message):
+        log_file.write(f"[{name}] {message}\n")
+    tracer = Tracer(name)
+    steps = PHASE_FUNCTIONS[name](spec, log, tracer)
+    next(steps)
+    counters = dict(tracer.counters)
+    written = blocks_written()
+    start = time.perf_counter()
+    cleanup = next(steps, False) is None
+    wall = time.perf_counter() - start
+    written = blocks_written() - written
+    counters = {key: value - counters.get(key, 0) for key, value in tracer.counters.items() if value != counters.get(key, 0)}
+    if cleanup: next(steps, None)
+    log_file.close()
+    copied = sum(counters.get(key, 0) for key in COPY_COUNTERS)
+    print(json.dumps({"phase": name, "wall": wall, "written": written, "copied": copied, "counters": counters, "peak_rss": peak_rss()}))
+
+
+def spawn_phase(name, spec):
+    env = dict(os.environ, BADMODLOADER_DSCSTOOLS=spec["tool"])
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-phase", name, json.dumps(spec)], env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr)
+        raise SystemExit(f"Phase '{name}' failed; see {os.path.join(spec['workdir'], 'bench.log')}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def tool_wrapper(workdir):
+    """A launcher that runs the stand-in tool with this interpreter, since Job runs the tool path directly."""
+    path = os.path.join(workdir, "fake_dscstools.sh")
+    with open(path, 'w') as f: f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(BENCH_DIR, "fake_dscstools.py")}" "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    # Não em /tmp: costuma ser tmpfs, onde o kernel não conta as escritas e os hardlinks nada economizam.
+    parser.add_argument("--workdir", default=os.path.join(os.path.expanduser("~"), ".cache", "badmodloader-bench"),
+                        help="Scratch folder on the drive to measure; it is deleted first unless --keep (default: ~/.cache/badmodloader-bench)")
+    parser.add_argument("--keep", action="store_true", help="Reuse what is already in --workdir, archives included (the --patch options are then ignored)")
+    parser.add_argument("--patch-files", type=int, default=2000, help="Entries across the synthetic patch archives (default: 2000)")
+    parser.add_argument("--patch-size", type=parse_size, default=parse_size("64MB"), help="Total uncompressed size of those entries (default: 64MB)")
+    parser.add_argument("--mods", type=int, nargs="+", default=[10], help="Mod counts to benchmark, each with freshly generated mods (default: 10)")
+    parser.add_argument("--mod-files", type=int, default=40, help="Files per mod (default: 40)")
+    parser.add_argument("--mod-size", type=parse_size, default=parse_size("4MB"), help="Total size of each mod (default: 4MB)")
+    parser.add_argument("--overlap", type=float, default=0.5, help="Share of mod files that replace archive entries (default: 0.5)")
+    parser.add_argument("--backend", choices=("dscstools", "native"), default="dscstools")
+    parser.add_argument("--staging", choices=("link", "copy"), default="link")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=list(PHASES))
+    parser.add_argument("--tool", help="DSCSToolsCLI to run instead of the stand-in (e.g. a wine wrapper)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--run-phase", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.run_phase:
+        run_phase(args.run_phase[0], json.loads(args.run_phase[1]))
+        return 0
+
+    from packing import format_size
+    workdir = os.path.abspath(args.workdir)
+    if not args.keep and os.path.exists(workdir): shutil.rmtree(workdir)
+    os.makedirs(workdir, exist_ok=True)
+    spec = {key: getattr(args, key) for key in ("patch_files", "patch_size", "mod_files", "mod_size", "overlap", "backend", "staging", "workers", "seed")}
+    spec.update(workdir=workdir, tool=os.path.abspath(args.tool) if args.tool else tool_wrapper(workdir))
+
+    results = []
+    print(f"{'mods':>5}  {'phase':<20} {'wall':>9} {'written':>11} {'copied':>11} {'peak RSS':>10}")
+    def report(mods, result):
+        result["mods"] = mods
+        results.append(result)
+        print(f"{mods:>5}  {result['phase']:<20} {result['wall']:>8.2f}s {format_size(result['written']):>11} {format_size(result['copied']):>11} {format_size(result['peak_rss']):>10}", flush=True)
+    if not os.path.exists(os.path.join(workdir, "archive_entries.json")):
+        report(0, spawn_phase("generate-archives", dict(spec, mods=0)))
+    for scale, mods in enumerate(args.mods):
+        report(mods, spawn_phase("generate-mods", dict(spec, mods=mods)))
+        for phase in PHASES:
+            # A extração não depende dos mods: só roda na primeira escala.
+            if phase not in args.phases or scale and phase.startswith("extract"): continue
+            report(mods, spawn_phase(phase, dict(spec, mods=mods)))
+    if args.json:
+        with open(args.json, 'w') as f: json.dump({"settings": spec, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Stand-in for DSCSToolsCLI.exe, so extraction and packing can run on Linux without the game's tools.
+
+    fake_dscstools.py --extract ARCHIVE OUTPUT_FOLDER
+    fake_dscstools.py --pack INPUT_FOLDER OUTPUT.mvgl
+
+Archives are read and written with the native MVGL code. Its behaviour can be
+scripted through environment variables:
+
+    FAKE_DSCSTOOLS_DELAY   seconds to sleep before doing anything
+    FAKE_DSCSTOOLS_OUTPUT  lines of progress output to print to stdout and stderr
+    FAKE_DSCSTOOLS_FAIL    fail (exit code 1) when any argument contains this text
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mvgl import MVGLReader, MVGLError, create_archive
+from packing import walk_files
+
+
+def main(argv):
+    if len(argv) != 3 or argv[0] not in ("--extract", "--pack"):
+        print("usage: fake_dscstools.py --extract ARCHIVE OUTPUT_FOLDER | --pack INPUT_FOLDER OUTPUT.mvgl", file=sys.stderr)
+        return 2
+    time.sleep(float(os.environ.get("FAKE_DSCSTOOLS_DELAY") or 0))
+    for i in range(int(os.environ.get("FAKE_DSCSTOOLS_OUTPUT") or 0)):
+        print(f"Processing {i}...")
+        print(f"Warning {i}", file=sys.stderr)
+    fail = os.environ.get("FAKE_DSCSTOOLS_FAIL")
+    if fail and any(fail in arg for arg in argv):
+        print(f"Failed: '{fail}' was requested to fail.", file=sys.stderr)
+        return 1
+    command, source, target = argv
+    try:
+        if command == "--extract":
+            with MVGLReader(source) as archive:
+                for entry in archive.list(): archive.extract(entry, os.path.join(target, *entry.name.split("/")))
+            print(f"Extracted {len(archive.entries)} files.")
+        else:
+            files = {rel_path: os.path.join(source, *rel_path.split("/")) for rel_path, st in walk_files(source)}
+            stats = create_archive(files, target)
+            print(f"Packed {stats.entries_added} files.")
+    except (MVGLError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,157 @@
+import errno
+import json
+import os
+import shutil
+import threading
+
+from packing import UNSUPPORTED_LINK_ERRORS, format_size, walk_files
+
+STORE_VERSION = 1
+
+
+class StoreStats:
+    def __init__(self):
+        self.files = 0
+        self.new_blobs = 0
+        self.deduplicated = 0
+        self.bytes_stored = 0
+        self.bytes_saved = 0
+
+    def summary(self):
+        return f"{self.files} file(s): {self.new_blobs} new ({format_size(self.bytes_stored)} stored), {self.deduplicated} shared with files already stored ({format_size(self.bytes_saved)} saved)"
+
+
+class BlobStore:
+    """Extracted files stored once by content, with a manifest of each archive's tree.
+
+    Blobs live in objects/ under their sha256 and manifests in manifests/, one per
+    archive, mapping each path to its blob. The folders in Extracted and
+    Extracted_Patches are only views: their files are hardlinks to the blobs, so
+    a file that is the same in several archives or languages takes space once, and
+    extracting a new game version only adds the blobs that changed. Files in a view
+    must never be written in place, since that would change the blob and every
+    other view sharing it; writers remove the file first.
+    """
+
+    def __init__(self, store_dir, hashes):
+        self.store_dir = store_dir
+        self.hashes = hashes
+        self.can_link = hasattr(os, "link")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.store_dir, "objects", digest[:2], digest)
+
+    def _manifest_path(self, name):
+        return os.path.join(self.store_dir, "manifests", f"{name}.json")
+
+    def manifest(self, name):
+        """{archive path: [sha256, size]} for name, or None if it was never stored."""
+        try:
+            with open(self._manifest_path(name), 'r') as f: data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data.get("files") if isinstance(data, dict) and data.get("version") == STORE_VERSION else None
+
+    def _link(self, src, dst):
+        """Hardlink src to dst through a temporary name, replacing dst; returns False when this file can't be linked."""
+        if not self.can_link: return False
+        temp_path = f"{dst}.{threading.get_ident()}.tmp"
+        try:
+            os.link(src, temp_path)
+        except OSError as e:
+            if e.errno == errno.EMLINK: return False # Só src atingiu o limite de links; os outros arquivos seguem linkados
+            if e.errno not in UNSUPPORTED_LINK_ERRORS: raise
+            self.can_link = False
+            return False
+        os.replace(temp_path, dst)
+        return True
+
+    def _bypass(self, name):
+        # Sem hardlinks, cada blob seria uma segunda cópia e cada view uma terceira: a árvore fica como está.
+        if os.path.exists(self._manifest_path(name)): os.remove(self._manifest_path(name))
+        return None
+
+    def ingest(self, name, tree_path):
+        """Store every file under tree_path as archive name's manifest and turn the files into links to their blobs.
+
+        Returns StoreStats, or None when the drive can't hardlink: the store is
+        bypassed then and tree_path keeps its plain files.
+        """
+        if not self.can_link: return self._bypass(name)
+        stats = StoreStats()
+        files = {}
+        for rel_path, st in walk_files(tree_path):
+            path = os.path.join(tree_path, *rel_path.split("/"))
+            digest = self.hashes.digest(path, st)
+            blob_path = self._blob_path(digest)
+            files[rel_path] = [digest, st.st_size]
+            stats.files += 1
+            if os.path.exists(blob_path):
+                if not os.path.samefile(blob_path, path) and self._link(blob_path, path):
+                    self.hashes.remember(path, digest)
+                    stats.deduplicated += 1
+                    stats.bytes_saved += st.st_size
+                elif not self.can_link: return self._bypass(name)
+                continue
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # O arquivo extraído vira o blob: nenhum byte é copiado, a não ser quando esse arquivo atingiu o limite de links.
+            if not self._link(path, blob_path):
+                if not self.can_link: return self._bypass(name)
+                temp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+                shutil.copy2(path, temp_path)
+                os.replace(temp_path, blob_path)
+            stats.new_blobs += 1
+            stats.bytes_stored += st.st_size
+        manifest_path = self._manifest_path(name)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path + ".tmp", 'w') as f: json.dump({"version": STORE_VERSION, "files": files}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        return stats
+
+    def materialize(self, name, dest_path):
+        """Make dest_path a view of archive name: link the files that differ and remove the ones it no longer has.
+
+        Returns (files linked or copied, files already in place), or None when name was never stored.
+        """
+        files = self.manifest(name)
+        if files is None: return None
+        changed = unchanged = 0
+        for rel_path, (digest, size) in files.items():
+            path = os.path.join(dest_path, *rel_path.split("/"))
+            blob_path = self._blob_path(digest)
+            if os.path.isfile(path):
+                st = os.stat(path)
+                if os.path.samefile(blob_path, path) or (st.st_size == size and self.hashes.digest(path, st) == digest):
+                    unchanged += 1
+                    continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not self._link(blob_path, path):
+                if os.path.lexists(path): os.remove(path)
+                shutil.copy2(blob_path, path)
+            changed += 1
+        if os.path.isdir(dest_path):
+            wanted = {rel_path.lower() for rel_path in files}
+            for rel_path, st in list(walk_files(dest_path)):
+                if rel_path.lower() not in wanted: os.remove(os.path.join(dest_path, *rel_path.split("/")))
+            for dirpath, dirnames, filenames in os.walk(dest_path, topdown=False):
+                if dirpath != dest_path and not os.listdir(dirpath): os.rmdir(dirpath)
+        return changed, unchanged
+
+    def prune(self):
+        """Delete the blobs no manifest uses any more; returns (blobs, bytes) removed. Views keep their own links to them."""
+        used = set()
+        manifests_dir = os.path.join(self.store_dir, "manifests")
+        if os.path.isdir(manifests_dir):
+            for filename in os.listdir(manifests_dir):
+                if not filename.endswith(".json"): continue
+                files = self.manifest(filename[:-len(".json")])
+                if files is None: return 0, 0 # Um manifesto ilegível pode estar usando qualquer blob
+                used.update(digest for digest, size in files.values())
+        removed = removed_bytes = 0
+        objects_dir = os.path.join(self.store_dir, "objects")
+        for rel_path, st in list(walk_files(objects_dir)) if os.path.isdir(objects_dir) else []:
+            if os.path.basename(rel_path) in used: continue
+            os.remove(os.path.join(objects_dir, *rel_path.split("/")))
+            removed += 1
+            removed_bytes += st.st_size
+        return removed, removed_bytes
@@ -0,0 +1,207 @@
+"""Command line for unattended extraction, packing and installing.
+
+Only the 'gui' command imports tkinter, so scripted runs start without it.
+"""
+import argparse
+import os
+
+import pipeline
+from jobs import DEFAULT_EXTRACT_WORKERS, MAX_EXTRACT_WORKERS
+from mod_index import ModIndex, list_mods
+from watch import watch_mods, DEBOUNCE_SECONDS
+from packing import STAGING_MODES, DEFAULT_PACK_WORKERS
+from tracing import Tracer
+from settings import MOD_INDEX_FILE, MODS_DIR, PACKED_DIR, PACK_BACKENDS, LANGUAGES, read_config
+
+
+def log(message):
+    print(message, flush=True)
+
+
+def language_name(value):
+    """'english', 'English' or the language code '1' -> 'English'; 'all' is kept for every language."""
+    if value.lower() == "all": return "all"
+    for name, code in LANGUAGES.items():
+        if value.lower() == name.lower() or value == code: return name
+    raise argparse.ArgumentTypeError(f"unknown language '{value}' (choose from {', '.join(LANGUAGES)} or all)")
+
+
+def worker_count(value):
+    workers = int(value)
+    if workers < 1: raise argparse.ArgumentTypeError("must be at least 1")
+    return workers
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="BadModLoader", description="A Bad Mod Loader for The Hundred Line -Last Defense Academy-. Run without a command to open the window.")
+    parser.add_argument("--workdir", help="Folder holding Mods, Extracted_Patches and the caches (default: the current folder)")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    commands.add_parser("gui", help="Open the mod manager window")
+
+    extract = commands.add_parser("extract", help="Extract .mvgl archives from the game's gamedata folder")
+    extract.add_argument("files", nargs="+", metavar="FILE", help="Archive names in gamedata, e.g. Patch_0.dx11.mvgl")
+    extract.add_argument("--game", help="Game folder (default: the one saved in config.json)")
+    extract.add_argument("--include", action="append", default=[], metavar="PATTERN", help="Only extract matching entries, e.g. 'lua/**/*.lua'; can be repeated")
+    extract.add_argument("--exclude", action="append", default=[], metavar="PATTERN", help="Skip matching entries; can be repeated")
+    extract.add_argument("--full", action="store_true", help="Rewrite every selected entry instead of only the changed ones")
+    extract.add_argument("--workers", type=worker_count, help=f"Archives extracted at once (default: config or {DEFAULT_EXTRACT_WORKERS})")
+    extract.add_argument("--copy-patches", action="store_true", help="Also put fully extracted Patch archives in Extracted_Patches (as links, taking no extra space)")
+
+    for name, help_text in (("pack", "Pack mods into .MVGL files"), ("install", "Pack mods and install them into the game's gamedata folder"),
+                            ("watch", "Install mods, then repack and install only the patches their edited files go into, until Ctrl+C")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--mods", nargs="+", metavar="MOD", help="Mods to pack, lowest wins on conflicts (default: every mod, in the saved load order)")
+        command.add_argument("--backend", choices=PACK_BACKENDS, help="Packer to use (default: config or dscstools)")
+        command.add_argument("--staging", choices=STAGING_MODES, help="How DSCSToolsCLI input is staged (default: config or link)")
+        command.add_argument("--workers", type=worker_count, help=f"Patches and entries packed at once (default: config or {DEFAULT_PACK_WORKERS})")
+        if name == "pack":
+            command.add_argument("--language", nargs="+", type=language_name, metavar="LANGUAGE", help="One or more languages, or 'all'; each gets its own subfolder when there are several (default: config)")
+            command.add_argument("--output", default=PACKED_DIR, help=f"Folder to copy the .MVGL files to (default: {PACKED_DIR})")
+        else:
+            command.add_argument("--language", type=language_name, metavar="LANGUAGE", help="Language to install (default: config)")
+            command.add_argument("--game", help="Game folder (default: the one saved in config.json)")
+        if name == "watch":
+            command.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS, metavar="SECONDS", help=f"Wait until files stop changing for this long (default: {DEBOUNCE_SECONDS})")
+
+    uninstall = commands.add_parser("uninstall", help="Put back the original archives that installed mods replaced")
+    uninstall.add_argument("--game", help="Game folder (default: the one saved in config.json)")
+    return parser
+
+
+def gamedata_folder(args, config):
+    game_path = args.game or config.get("game_path")
+    gamedata_path = os.path.join(game_path, "gamedata") if game_path else None
+    if not gamedata_path or not os.path.isdir(gamedata_path):
+        log(f"ERROR: No 'gamedata' folder in the game folder '{game_path or ''}'. Pass --game.")
+        return None
+    return gamedata_path
+
+
+def extract(args, config, tracer):
+    gamedata_path = gamedata_folder(args, config)
+    if gamedata_path is None: return 1
+    missing = [f for f in args.files if not os.path.isfile(os.path.join(gamedata_path, f))]
+    if missing:
+        log(f"ERROR: Not found in '{gamedata_path}': {', '.join(missing)}")
+        return 1
+    filters = {f: {"include": ",".join(args.include), "exclude": ",".join(args.exclude)} for f in args.files}
+    try:
+        jobs = pipeline.extraction_jobs(args.files, gamedata_path, filters, not args.full)
+    except ValueError as e:
+        log(f"ERROR: {e}")
+        return 1
+    workers = args.workers or configured_workers(config, "extract_workers", DEFAULT_EXTRACT_WORKERS)
+    pool = pipeline.extraction_pool(jobs, min(workers, MAX_EXTRACT_WORKERS), tracer)
+    failures = pipeline.run_extraction(pool, log)
+    patch_names = pipeline.extracted_patches(pool)
+    if args.copy_patches and patch_names: pipeline.link_extracted_patches(patch_names, log, tracer)
+    return 1 if failures else 0
+
+
+def pack_options(args, config):
+    """(mod names, ModIndex, backend, staging mode, workers) from the arguments, falling back to config."""
+    load_order = config.get("load_order", [])
+    mod_names = args.mods or list_mods(MODS_DIR, load_order if isinstance(load_order, list) else [])
+    unknown = [m for m in mod_names if not os.path.isdir(os.path.join(MODS_DIR, m))]
+    if unknown: raise pipeline.PackError("Unknown Mods", f"Not found in '{MODS_DIR}': {', '.join(unknown)}")
+    if not mod_names: raise pipeline.NothingToPack("No Mods", f"There are no mods in '{MODS_DIR}'.")
+    mod_index = ModIndex(MOD_INDEX_FILE, MODS_DIR)
+    backend = args.backend or (config.get("pack_backend") if config.get("pack_backend") in PACK_BACKENDS else PACK_BACKENDS[0])
+    staging_mode = args.staging or (config.get("staging_mode") if config.get("staging_mode") in STAGING_MODES else STAGING_MODES[0])
+    workers = args.workers or configured_workers(config, "pack_workers", DEFAULT_PACK_WORKERS)
+    return mod_names, mod_index, backend, staging_mode, workers
+
+
+def pack_languages(args, config, languages, tracer):
+    """Pack for each language; yields (language, packed files) and stops at the first failure."""
+    mod_names, mod_index, backend, staging_mode, workers = pack_options(args, config)
+    for language in languages:
+        log(f"Packing mods for {language}: {', '.join(mod_names)}")
+        with tracer.span(f"pack {language}", "run"):
+            mvgl_files = pipeline.pack_mods(mod_names, language, mod_index, log, backend, staging_mode, workers, tracer=tracer)
+        yield language, mvgl_files
+
+
+def configured_workers(config, key, default):
+    workers = config.get(key, default)
+    return workers if isinstance(workers, int) and workers >= 1 else default
+
+
+def configured_language(config):
+    language = config.get("language")
+    return language if language in LANGUAGES else "English"
+
+
+def pack(args, config, tracer):
+    languages = args.language or [configured_language(config)]
+    if "all" in languages: languages = list(LANGUAGES)
+    languages = list(dict.fromkeys(languages))
+    for language, mvgl_files in pack_languages(args, config, languages, tracer):
+        output_dir = os.path.join(args.output, language) if len(languages) > 1 else args.output
+        os.makedirs(output_dir, exist_ok=True)
+        pipeline.copy_packed(mvgl_files, output_dir, log, tracer)
+    return 0
+
+
+def install(args, config, tracer):
+    if args.language == "all":
+        log("ERROR: Only one language can be installed at a time.")
+        return 1
+    gamedata_path = gamedata_folder(args, config)
+    if gamedata_path is None: return 1
+    for language, mvgl_files in pack_languages(args, config, [args.language or configured_language(config)], tracer):
+        pipeline.install_packed(mvgl_files, os.path.dirname(gamedata_path), log, tracer)
+    return 0
+
+
+def watch(args, config, tracer):
+    if args.language == "all":
+        log("ERROR: Only one language can be installed at a time.")
+        return 1
+    gamedata_path = gamedata_folder(args, config)
+    if gamedata_path is None: return 1
+    mod_names, mod_index, backend, staging_mode, workers = pack_options(args, config)
+    try:
+        watch_mods(mod_names, args.language or configured_language(config), os.path.dirname(gamedata_path), mod_index, log, backend, staging_mode, workers,
+                   debounce=args.debounce, tracer=tracer)
+    except KeyboardInterrupt:
+        log("Stopped watching mods.")
+    return 0
+
+
+def uninstall(args, config, tracer):
+    gamedata_path = gamedata_folder(args, config)
+    if gamedata_path is None: return 1
+    pipeline.uninstall_mods(os.path.dirname(gamedata_path), log, tracer)
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workdir: os.chdir(args.workdir)
+    if args.command in (None, "gui"):
+        from gui import run
+        run()
+        return 0
+    try:
+        config = read_config()
+    except (ValueError, OSError) as e:
+        log(f"Could not read config file ({e}). Using defaults.")
+        config = {}
+    tracer = Tracer(args.command)
+    try:
+        with tracer.span(args.command, "run"):
+            return {"extract": extract, "pack": pack, "install": install, "watch": watch, "uninstall": uninstall}[args.command](args, config, tracer)
+    except pipeline.PackError as e:
+        log(f"ERROR: {e.title}: {e}")
+        return 1
+    except OSError as e:
+        log(f"ERROR: {e}")
+        return 1
+    except KeyboardInterrupt:
+        log("Cancelled.")
+        return 130
+    finally:
+        pipeline.report_trace(tracer, log)
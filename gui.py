@@ -0,0 +1,646 @@
+import os
+import json
+import queue
+import threading
+import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog, Toplevel, Listbox, Scrollbar
+
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+from ttkbootstrap.scrolled import ScrolledText
+
+import pipeline
+from jobs import CancelToken, LogBuffer, DEFAULT_EXTRACT_WORKERS, MAX_EXTRACT_WORKERS
+from packing import format_size, STAGING_MODES, DEFAULT_PACK_WORKERS
+from mvgl import MVGLReader, MVGLError
+from mod_index import ModIndex, list_mods
+from tracing import Tracer
+from watch import watch_mods, POLL_INTERVAL, DEBOUNCE_SECONDS
+from settings import (CONFIG_FILE, MOD_INDEX_FILE, MODS_DIR, EXTRACTED_DIR, EXTRACTED_PATCHES_DIR, PACKED_DIR, PACK_CACHE_DIR,
+                      PACK_BACKENDS, LANGUAGES, TOOLS_EXE_PATH, patch_map_for, read_config)
+
+LOG_FLUSH_INTERVAL_MS = 33 # O log é desenhado no máximo ~30 vezes por segundo
+LOG_MAX_LINES = 2000
+
+class ModManagerApp(ttk.Window):
+    def __init__(self):
+        super().__init__(themename="cyborg", title="The Hundred Line - Mod Manager")
+        self.geometry("800x750")
+        self.minsize(600, 550)
+
+        # --- Variables ---
+        self.game_path = tk.StringVar()
+        self.language_var = tk.StringVar()
+        self.extract_workers = tk.IntVar(value=DEFAULT_EXTRACT_WORKERS)
+        self.link_staging = tk.BooleanVar(value=True)
+        self.native_packing = tk.BooleanVar(value=False)
+        self.pack_workers = tk.IntVar(value=DEFAULT_PACK_WORKERS)
+        self.extract_filters = {}
+        self.extract_incremental = tk.BooleanVar(value=True)
+        self.mod_vars = {}
+        self.conflict_labels = {}
+        self.load_order = []
+        self.mod_index = ModIndex(MOD_INDEX_FILE, MODS_DIR)
+        self.log_buffer = LogBuffer()
+        self.cancel_token = CancelToken()
+        self.active_pool = None
+        self.busy = False
+        self.mod_controls = [] # Desativados enquanto algo roda: mexem no índice de mods que a tarefa está usando
+
+        # --- Setup Paths ---
+        self.setup_initial_directories()
+
+        # --- UI Creation ---
+        self.create_widgets()
+
+        # --- Initial Load ---
+        self.flush_log()
+        self.load_config()
+        self.refresh_mod_list()
+
+    def setup_initial_directories(self):
+        """Create necessary directories on startup if they don't exist."""
+        for dir_path in [MODS_DIR, EXTRACTED_DIR, EXTRACTED_PATCHES_DIR, PACKED_DIR, PACK_CACHE_DIR]:
+            if not os.path.exists(dir_path):
+                os.makedirs(dir_path)
+
+    def create_widgets(self):
+        """Creates and places all the GUI widgets."""
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(fill=BOTH, expand=True)
+        config_frame = ttk.Labelframe(main_frame, text="Configuration", padding="10")
+        config_frame.pack(fill=X, pady=(0, 10))
+        path_label = ttk.Label(config_frame, text="Game Folder:")
+        path_label.grid(row=0, column=0, sticky=W, padx=(0, 5))
+        path_entry = ttk.Entry(config_frame, textvariable=self.game_path, state="readonly")
+        path_entry.grid(row=0, column=1, sticky=EW, padx=(0, 10))
+        path_button = ttk.Button(config_frame, text="Select...", command=self.select_game_folder, style="success.TButton")
+        path_button.grid(row=0, column=2, sticky=E)
+        lang_label = ttk.Label(config_frame, text="Mod Language:")
+        lang_label.grid(row=1, column=0, sticky=W, padx=(0, 5), pady=(10, 0))
+        lang_combo = ttk.Combobox(config_frame, textvariable=self.language_var, values=list(LANGUAGES.keys()), state="readonly")
+        lang_combo.grid(row=1, column=1, sticky=EW, pady=(10, 0))
+        lang_combo.bind("<<ComboboxSelected>>", self.save_config)
+        link_check = ttk.Checkbutton(config_frame, text="Link base files when staging (faster, falls back to copying)", variable=self.link_staging, command=self.save_config, style="primary.TCheckbutton")
+        link_check.grid(row=2, column=1, sticky=W, pady=(10, 0))
+        native_check = ttk.Checkbutton(config_frame, text="Pack natively (copies unchanged files straight from the original archive)", variable=self.native_packing, command=self.save_config, style="primary.TCheckbutton")
+        native_check.grid(row=3, column=1, sticky=W, pady=(5, 0))
+        workers_label = ttk.Label(config_frame, text="Pack Workers:")
+        workers_label.grid(row=4, column=0, sticky=W, padx=(0, 5), pady=(5, 0))
+        workers_spin = ttk.Spinbox(config_frame, from_=1, to=DEFAULT_PACK_WORKERS, width=4, textvariable=self.pack_workers, state="readonly", command=self.save_config)
+        workers_spin.grid(row=4, column=1, sticky=W, pady=(5, 0))
+        config_frame.columnconfigure(1, weight=1)
+        mods_frame = ttk.Labelframe(main_frame, text="Available Mods", padding="10")
+        mods_frame.pack(fill=BOTH, expand=True, pady=10)
+        self.mod_list_canvas = ttk.Frame(mods_frame)
+        self.mod_list_canvas.pack(fill=BOTH, expand=True)
+        actions_frame = ttk.Frame(main_frame, padding="10")
+        actions_frame.pack(fill=X)
+        left_actions = ttk.Frame(actions_frame)
+        left_actions.pack(side=LEFT)
+        self.create_mod_btn = ttk.Button(left_actions, text="Create New Mod", command=self.create_mod)
+        self.create_mod_btn.pack(side=LEFT, padx=(0, 5))
+        self.extract_btn = ttk.Button(left_actions, text="Extract MVGL", command=self.open_extract_window, state=DISABLED)
+        self.extract_btn.pack(side=LEFT)
+        self.conflicts_btn = ttk.Button(left_actions, text="Conflicts", command=self.show_conflicts, style="warning.TButton")
+        self.conflicts_btn.pack(side=LEFT, padx=(5, 0))
+        self.uninstall_btn = ttk.Button(left_actions, text="Uninstall All Mods", command=self.uninstall_mods, style="secondary.TButton")
+        self.uninstall_btn.pack(side=LEFT, padx=(5, 0))
+        right_actions = ttk.Frame(actions_frame)
+        right_actions.pack(side=RIGHT)
+        self.cancel_btn = ttk.Button(right_actions, text="Cancel", command=self.cancel_jobs, style="danger.TButton", state=DISABLED)
+        self.cancel_btn.pack(side=LEFT, padx=(0, 5))
+        self.watch_btn = ttk.Button(right_actions, text="Watch and Install", command=self.watch_mods, style="success.TButton")
+        self.watch_btn.pack(side=LEFT, padx=(0, 5))
+        self.pack_btn = ttk.Button(right_actions, text="Pack Only", command=lambda: self.pack_mods(install=False), style="info.TButton")
+        self.pack_btn.pack(side=LEFT, padx=(0, 5))
+        self.pack_install_btn = ttk.Button(right_actions, text="Pack and Install", command=lambda: self.pack_mods(install=True), style="primary.TButton")
+        self.pack_install_btn.pack(side=LEFT)
+        log_frame = ttk.Labelframe(main_frame, text="Log", padding="10")
+        log_frame.pack(fill=X, pady=(10, 0))
+        self.log_text = ScrolledText(log_frame, height=8, autohide=True)
+        self.log_text.pack(fill=X, expand=True)
+        self.log_text.text.configure(state='disabled')
+
+    def log(self, message):
+        # Pode ser chamado de qualquer thread; flush_log desenha as linhas.
+        self.log_buffer.append(message)
+
+    def flush_log(self):
+        lines, dropped = self.log_buffer.drain()
+        if lines:
+            if dropped: lines.insert(0, f"... {dropped} log line(s) skipped ...")
+            text = self.log_text.text
+            text.configure(state='normal')
+            text.insert(END, "\n".join(lines) + "\n")
+            excess = int(text.index('end-1c').split('.')[0]) - LOG_MAX_LINES
+            if excess > 0: text.delete("1.0", f"{excess + 1}.0")
+            text.see(END)
+            text.configure(state='disabled')
+        self.after(LOG_FLUSH_INTERVAL_MS, self.flush_log)
+
+    def set_busy(self, busy):
+        # Um token novo só quando nada está rodando: a tarefa em andamento precisa continuar cancelável.
+        if busy and not self.busy: self.cancel_token = CancelToken()
+        self.busy = busy
+        for button in (self.watch_btn, self.pack_btn, self.pack_install_btn, self.uninstall_btn, self.create_mod_btn, self.conflicts_btn, *self.mod_controls):
+            button.config(state=DISABLED if busy else NORMAL)
+        has_gamedata = os.path.isdir(os.path.join(self.game_path.get(), "gamedata"))
+        self.extract_btn.config(state=NORMAL if has_gamedata and not busy else DISABLED)
+        self.cancel_btn.config(state=NORMAL if busy else DISABLED)
+
+    def cancel_jobs(self):
+        self.log("Cancelling running jobs...")
+        self.cancel_token.cancel()
+        if self.active_pool is not None: self.active_pool.cancel()
+
+    def run_task(self, func, *args):
+        """Run func(*args) on a worker thread while the window keeps processing events; returns its result or re-raises."""
+        result = {}
+        def worker():
+            try: result["value"] = func(*args)
+            except Exception as e: result["error"] = e
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        finished = tk.BooleanVar(value=False)
+        self.after(LOG_FLUSH_INTERVAL_MS, self.watch, lambda: not thread.is_alive(), finished)
+        self.wait_variable(finished)
+        if "error" in result: raise result["error"]
+        return result["value"]
+
+    def watch(self, is_done, finished):
+        if is_done(): finished.set(True)
+        else: self.after(LOG_FLUSH_INTERVAL_MS, self.watch, is_done, finished)
+
+    def load_config(self):
+        try:
+            config = read_config()
+            path = config.get("game_path")
+            if path and os.path.isdir(path):
+                self.game_path.set(path)
+                self.validate_game_path()
+            language = config.get("language", "English")
+            if language in LANGUAGES: self.language_var.set(language)
+            else: self.language_var.set("English")
+            workers = config.get("extract_workers", DEFAULT_EXTRACT_WORKERS)
+            if isinstance(workers, int) and 1 <= workers <= MAX_EXTRACT_WORKERS: self.extract_workers.set(workers)
+            self.link_staging.set(config.get("staging_mode", "link") == "link")
+            self.native_packing.set(config.get("pack_backend", "dscstools") == "native")
+            pack_workers = config.get("pack_workers", DEFAULT_PACK_WORKERS)
+            if isinstance(pack_workers, int) and 1 <= pack_workers <= DEFAULT_PACK_WORKERS: self.pack_workers.set(pack_workers)
+            filters = config.get("extract_filters", {})
+            if isinstance(filters, dict): self.extract_filters = filters
+            self.extract_incremental.set(bool(config.get("extract_incremental", True)))
+            load_order = config.get("load_order", [])
+            if isinstance(load_order, list): self.load_order = [m for m in load_order if isinstance(m, str)]
+        except (ValueError, IOError):
+            self.log("Could not read config file. Using defaults.")
+            self.language_var.set("English")
+
+    def save_config(self, event=None):
+        config_data = {"game_path": self.game_path.get(), "language": self.language_var.get(), "extract_workers": self.get_extract_workers(), "staging_mode": self.get_staging_mode(), "pack_backend": self.get_pack_backend(), "pack_workers": self.get_pack_workers(),
+                       "extract_filters": self.extract_filters, "extract_incremental": self.extract_incremental.get(),
+                       "load_order": self.load_order}
+        with open(CONFIG_FILE, 'w') as f: json.dump(config_data, f, indent=4)
+        self.log(f"Configuration saved. (Language: {self.language_var.get()})")
+
+    def get_extract_workers(self):
+        try: workers = int(self.extract_workers.get())
+        except (tk.TclError, ValueError): workers = DEFAULT_EXTRACT_WORKERS
+        return max(1, min(workers, MAX_EXTRACT_WORKERS))
+
+    def get_staging_mode(self):
+        return STAGING_MODES[0] if self.link_staging.get() else STAGING_MODES[1]
+
+    def get_pack_workers(self):
+        try: workers = int(self.pack_workers.get())
+        except (tk.TclError, ValueError): workers = DEFAULT_PACK_WORKERS
+        return max(1, min(workers, DEFAULT_PACK_WORKERS))
+
+    def get_pack_backend(self):
+        return PACK_BACKENDS[1] if self.native_packing.get() else PACK_BACKENDS[0]
+
+    def select_game_folder(self):
+        path = filedialog.askdirectory(title="Select The Hundred Line Game Folder")
+        if path:
+            self.game_path.set(path)
+            self.validate_game_path()
+            self.save_config()
+
+    def validate_game_path(self):
+        path = self.game_path.get()
+        gamedata_path = os.path.join(path, "gamedata")
+        if os.path.isdir(gamedata_path):
+            self.extract_btn.config(state=DISABLED if self.busy else NORMAL)
+            self.log(f"Game folder set to: {path}")
+        else:
+            self.extract_btn.config(state=DISABLED)
+            self.log(f"Invalid game folder selected: {path}. 'gamedata' not found.")
+
+    def refresh_mod_list(self):
+        selected = {name for name, var in self.mod_vars.items() if var.get()}
+        for widget in self.mod_list_canvas.winfo_children(): widget.destroy()
+        self.mod_vars = {}
+        self.conflict_labels = {}
+        self.mod_controls = []
+        if not os.path.exists(MODS_DIR): os.makedirs(MODS_DIR)
+        try:
+            # A ordem de carga decide qual mod vence quando dois mudam o mesmo arquivo (o de baixo vence).
+            self.load_order = list_mods(MODS_DIR, self.load_order)
+            self.mod_index.refresh()
+            self.mod_index.save()
+            for mod_name in self.load_order:
+                row = ttk.Frame(self.mod_list_canvas)
+                row.pack(fill=X, padx=5, pady=2)
+                var = tk.BooleanVar(value=mod_name in selected)
+                cb = ttk.Checkbutton(row, text=mod_name, variable=var, command=self.update_conflicts, style="primary.TCheckbutton")
+                cb.pack(side=LEFT)
+                down_btn = ttk.Button(row, text="\u25BC", width=2, command=lambda m=mod_name: self.move_mod(m, 1), style="secondary.TButton")
+                down_btn.pack(side=RIGHT)
+                up_btn = ttk.Button(row, text="\u25B2", width=2, command=lambda m=mod_name: self.move_mod(m, -1), style="secondary.TButton")
+                up_btn.pack(side=RIGHT, padx=(0, 2))
+                conflict_label = ttk.Label(row, text="", style="warning.TLabel")
+                conflict_label.pack(side=LEFT, padx=(10, 0))
+                self.mod_vars[mod_name] = var
+                self.conflict_labels[mod_name] = conflict_label
+                self.mod_controls += [cb, down_btn, up_btn]
+        except FileNotFoundError: self.log(f"'{MODS_DIR}' folder not found. It will be created.")
+        self.update_conflicts()
+
+    def move_mod(self, mod_name, step):
+        if self.busy: return
+        index = self.load_order.index(mod_name)
+        new_index = index + step
+        if not 0 <= new_index < len(self.load_order): return
+        self.load_order[index], self.load_order[new_index] = self.load_order[new_index], self.load_order[index]
+        self.save_config()
+        self.refresh_mod_list()
+
+    def selected_mods(self):
+        """The checked mods, in load order."""
+        return [name for name, var in self.mod_vars.items() if var.get()]
+
+    def update_conflicts(self):
+        conflicts = self.mod_index.conflicts(self.selected_mods(), self.get_dynamic_patch_map())
+        counts = {}
+        for providers in conflicts.values():
+            for mod_name in {p[0] for p in providers}: counts[mod_name] = counts.get(mod_name, 0) + 1
+        for mod_name, label in self.conflict_labels.items():
+            count = counts.get(mod_name, 0)
+            label.config(text=f"{count} conflicting file(s)" if count else "")
+
+    def show_conflicts(self):
+        if self.busy: return
+        selected_mods = self.selected_mods()
+        self.mod_index.refresh(selected_mods)
+        conflicts = self.mod_index.conflicts(selected_mods, self.get_dynamic_patch_map())
+        if not conflicts:
+            messagebox.showinfo("No Conflicts", "None of the selected mods change the same file.")
+            return
+        top = Toplevel(self); top.title("Mod Conflicts"); top.geometry("720x400")
+        frame = ttk.Frame(top, padding=10); frame.pack(fill=BOTH, expand=True)
+        ttk.Label(frame, text="These files are changed by more than one selected mod. The mod lowest in the list wins.").pack(anchor=W, pady=(0, 5))
+        tree = ttk.Treeview(frame, columns=("patch", "mods", "winner"))
+        tree.heading("#0", text="File"); tree.heading("patch", text="Patch"); tree.heading("mods", text="Mods"); tree.heading("winner", text="Used")
+        tree.column("#0", width=260); tree.column("patch", width=130); tree.column("mods", width=200); tree.column("winner", width=100)
+        for (patch_name, _), providers in sorted(conflicts.items()):
+            tree.insert("", END, text=providers[-1][2], values=(patch_name, ", ".join(p[0] for p in providers), providers[-1][0]))
+        tree.pack(side=LEFT, fill=BOTH, expand=True)
+        scrollbar = Scrollbar(frame, orient=VERTICAL, command=tree.yview); scrollbar.pack(side=RIGHT, fill=Y)
+        tree.config(yscrollcommand=scrollbar.set)
+
+    def create_mod(self):
+        if self.busy: return
+        mod_name = simpledialog.askstring("Create Mod", "Enter the name for the new mod:")
+        if not mod_name: return
+        sanitized_name = "".join(c for c in mod_name if c.isalnum() or c in (' ', '_', '-')).rstrip()
+        if not sanitized_name:
+            messagebox.showerror("Invalid Name", "Mod name contains invalid characters.")
+            return
+        mod_path = os.path.join(MODS_DIR, sanitized_name)
+        if os.path.exists(mod_path):
+            messagebox.showwarning("Mod Exists", f"A mod named '{sanitized_name}' already exists.")
+            return
+        try:
+            os.makedirs(mod_path)
+            # Adicionada a pasta 'root'
+            subfolders = ["lua", "images", "text", "message", "data", "root"]
+            for folder in subfolders:
+                os.makedirs(os.path.join(mod_path, folder))
+            self.log(f"Created mod: {sanitized_name}")
+            self.refresh_mod_list()
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not create mod directory: {e}")
+
+    def open_extract_window(self):
+        if self.busy: return
+        gamedata_path = os.path.join(self.game_path.get(), "gamedata")
+        if not os.path.isdir(gamedata_path):
+            messagebox.showerror("Error", "Game 'gamedata' folder not found.")
+            return
+        mvgl_files = sorted([f for f in os.listdir(gamedata_path) if f.lower().endswith(".mvgl")])
+        if not mvgl_files:
+            messagebox.showinfo("No Files", "No .mvgl files found in the gamedata folder.")
+            return
+        top = Toplevel(self); top.title("Select MVGL files to Extract")
+        listbox_frame = ttk.Frame(top, padding=10); listbox_frame.pack(fill=BOTH, expand=True)
+        listbox = Listbox(listbox_frame, selectmode=EXTENDED)
+        for f in mvgl_files: listbox.insert(END, f)
+        listbox.pack(side=LEFT, fill=BOTH, expand=True)
+        scrollbar = Scrollbar(listbox_frame, orient=VERTICAL, command=listbox.yview); scrollbar.pack(side=RIGHT, fill=Y)
+        listbox.config(yscrollcommand=scrollbar.set)
+        top.geometry("480x560")
+        filter_frame = ttk.Labelframe(top, text="Selective extraction (leave both empty to extract everything)", padding=10)
+        filter_frame.pack(fill=X, padx=10)
+        filter_label = ttk.Label(filter_frame, text="Select a file to edit its patterns.")
+        filter_label.grid(row=0, column=0, columnspan=2, sticky=W)
+        include_var, exclude_var = tk.StringVar(), tk.StringVar()
+        ttk.Label(filter_frame, text="Include:").grid(row=1, column=0, sticky=W, padx=(0, 5), pady=(5, 0))
+        ttk.Entry(filter_frame, textvariable=include_var).grid(row=1, column=1, sticky=EW, pady=(5, 0))
+        ttk.Label(filter_frame, text="Exclude:").grid(row=2, column=0, sticky=W, padx=(0, 5), pady=(5, 0))
+        ttk.Entry(filter_frame, textvariable=exclude_var).grid(row=2, column=1, sticky=EW, pady=(5, 0))
+        ttk.Checkbutton(filter_frame, text="Skip files that are already up to date", variable=self.extract_incremental, style="primary.TCheckbutton").grid(row=3, column=1, sticky=W, pady=(5, 0))
+        filter_frame.columnconfigure(1, weight=1)
+        # Os padrões são guardados por arquivo; os campos mostram os do último arquivo clicado.
+        editing = {"file": None, "selection": ()}
+
+        def store_filters(*args):
+            if editing["file"] is None: return
+            include, exclude = include_var.get().strip(), exclude_var.get().strip()
+            if include or exclude: self.extract_filters[editing["file"]] = {"include": include, "exclude": exclude}
+            else: self.extract_filters.pop(editing["file"], None)
+
+        def on_select(event):
+            # ACTIVE ainda é o item anterior aqui: o Tk só o muda ao soltar o botão.
+            selection = listbox.curselection()
+            added = [i for i in selection if i not in editing["selection"]]
+            editing["selection"] = selection
+            if added: active = listbox.get(added[-1])
+            elif len(selection) == 1: active = listbox.get(selection[0])
+            else: return
+            if active == editing["file"]: return
+            editing["file"] = None
+            filters = self.extract_filters.get(active, {})
+            include_var.set(filters.get("include", "")); exclude_var.set(filters.get("exclude", ""))
+            editing["file"] = active
+            filter_label.config(text=f"Patterns for {active}, e.g. lua/**/*.lua or message/*")
+
+        listbox.bind("<<ListboxSelect>>", on_select)
+        include_var.trace_add("write", store_filters); exclude_var.trace_add("write", store_filters)
+        btn_frame = ttk.Frame(top, padding=10); btn_frame.pack(fill=X)
+        ttk.Label(btn_frame, text="Parallel jobs:").pack(side=LEFT)
+        workers_spin = ttk.Spinbox(btn_frame, from_=1, to=MAX_EXTRACT_WORKERS, width=4, textvariable=self.extract_workers, state="readonly")
+        workers_spin.pack(side=LEFT, padx=(5, 0))
+        extract_button = ttk.Button(btn_frame, text="Extract Selected", command=lambda: self.perform_extraction(listbox, top))
+        extract_button.pack(side=RIGHT)
+        browse_button = ttk.Button(btn_frame, text="Browse Contents", command=lambda: self.open_archive_browser(listbox, top), style="secondary.TButton")
+        browse_button.pack(side=RIGHT, padx=(0, 5))
+
+    def open_archive_browser(self, listbox, parent):
+        """Shows the files inside one archive, read natively, without extracting it."""
+        selected_indices = listbox.curselection()
+        if len(selected_indices) != 1:
+            messagebox.showwarning("Select One File", "Please select exactly one file to browse.", parent=parent)
+            return
+        filename = listbox.get(selected_indices[0])
+        try:
+            archive_path = pipeline.game_archive_path(os.path.join(self.game_path.get(), "gamedata"), filename)
+            if archive_path is None: raise OSError("It was added by installed mods and is not one of the game's archives.")
+            archive = MVGLReader(archive_path)
+        except (MVGLError, OSError) as e:
+            messagebox.showerror("Cannot Read Archive", f"Could not read '{filename}':\n{e}", parent=parent)
+            return
+        entries = archive.list()
+        folders = {"": []}
+        subfolders = {"": set()}
+        for entry in entries:
+            folder = entry.name.rpartition("/")[0]
+            folders.setdefault(folder, []).append(entry)
+            while folder and folder not in subfolders:
+                subfolders[folder] = set()
+                parent_folder = folder.rpartition("/")[0]
+                subfolders.setdefault(parent_folder, set()).add(folder)
+                folders.setdefault(parent_folder, [])
+                folder = parent_folder
+        top = Toplevel(self); top.title(f"Browse {filename}"); top.geometry("640x520")
+        top.protocol("WM_DELETE_WINDOW", lambda: (archive.close(), top.destroy()))
+        frame = ttk.Frame(top, padding=10); frame.pack(fill=BOTH, expand=True)
+        total_size = sum(entry.size for entry in entries)
+        ttk.Label(frame, text=f"{len(entries)} files, {format_size(total_size)} ({archive.layout.name} archive)").pack(anchor=W, pady=(0, 5))
+        tree = ttk.Treeview(frame, columns=("size", "packed"))
+        tree.heading("#0", text="Path"); tree.heading("size", text="Size"); tree.heading("packed", text="Packed")
+        tree.column("#0", width=380); tree.column("size", width=90, anchor=E); tree.column("packed", width=90, anchor=E)
+        tree.pack(side=LEFT, fill=BOTH, expand=True)
+        scrollbar = Scrollbar(frame, orient=VERTICAL, command=tree.yview); scrollbar.pack(side=RIGHT, fill=Y)
+        tree.config(yscrollcommand=scrollbar.set)
+
+        # As pastas são preenchidas só quando abertas; App_0 tem arquivos demais para inserir tudo de uma vez.
+        def populate(node, folder):
+            for subfolder in sorted(subfolders.get(folder, ())):
+                child = tree.insert(node, END, iid="d:" + subfolder, text=subfolder.rpartition("/")[2] + "/")
+                tree.insert(child, END, iid="p:" + subfolder)
+            for entry in sorted(folders.get(folder, ()), key=lambda e: e.name):
+                tree.insert(node, END, iid="f:" + entry.name, text=entry.name.rpartition("/")[2], values=(format_size(entry.size), format_size(entry.compressed_size)))
+
+        def on_open(event):
+            node = tree.focus()
+            if node.startswith("d:") and tree.exists("p:" + node[2:]):
+                tree.delete("p:" + node[2:])
+                populate(node, node[2:])
+
+        def extract_selected():
+            names = [node[2:] for node in tree.selection() if node.startswith("f:")]
+            if not names:
+                messagebox.showwarning("No Selection", "Please select one or more files to extract.", parent=top)
+                return
+            output_root = os.path.join(EXTRACTED_DIR, os.path.splitext(filename)[0])
+            for name in names:
+                try:
+                    size = archive.extract(name, os.path.join(output_root, *name.split("/")))
+                    self.log(f"Extracted '{name}' ({format_size(size)}) to '{output_root}'.")
+                except (MVGLError, OSError) as e:
+                    self.log(f"ERROR: Could not extract '{name}': {e}")
+                    messagebox.showerror("Extraction Failed", f"Could not extract '{name}':\n{e}", parent=top)
+                    return
+
+        tree.bind("<<TreeviewOpen>>", on_open)
+        populate("", "")
+        btn_frame = ttk.Frame(top, padding=10); btn_frame.pack(fill=X)
+        ttk.Button(btn_frame, text="Extract Selected Files", command=extract_selected).pack(side=RIGHT)
+
+    def perform_extraction(self, listbox, top_window):
+        if self.busy:
+            messagebox.showwarning("Busy", "Wait for the running task to finish, or cancel it, before extracting.", parent=top_window)
+            return
+        selected_indices = listbox.curselection()
+        if not selected_indices:
+            messagebox.showwarning("No Selection", "Please select one or more files to extract.", parent=top_window)
+            return
+        selected_files = [listbox.get(i) for i in selected_indices]
+        gamedata_path = os.path.join(self.game_path.get(), "gamedata")
+        try:
+            jobs = pipeline.extraction_jobs(selected_files, gamedata_path, self.extract_filters, self.extract_incremental.get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Pattern", str(e), parent=top_window)
+            return
+        top_window.destroy()
+        self.save_config()
+        pool = pipeline.extraction_pool(jobs, self.get_extract_workers(), Tracer("extract"))
+        self.log(f"Extracting {len(jobs)} file(s) with up to {pool.max_workers} parallel job(s)...")
+        self.set_busy(True)
+        self.active_pool = pool
+        progress = self.open_extraction_progress(jobs)
+        pool.start()
+        self.poll_extraction(pool, progress)
+
+    def open_extraction_progress(self, jobs):
+        top = Toplevel(self); top.title("Extracting MVGL files"); top.geometry("520x320")
+        top.protocol("WM_DELETE_WINDOW", lambda: None)
+        frame = ttk.Frame(top, padding=10); frame.pack(fill=BOTH, expand=True)
+        tree = ttk.Treeview(frame, columns=("status", "time"), height=8)
+        tree.heading("#0", text="Archive"); tree.heading("status", text="Status"); tree.heading("time", text="Time")
+        tree.column("#0", width=280); tree.column("status", width=100, anchor=CENTER); tree.column("time", width=80, anchor=E)
+        for job in jobs: tree.insert("", END, iid=job.filename, text=job.filename, values=(job.status, ""))
+        tree.pack(fill=BOTH, expand=True)
+        bar = ttk.Progressbar(frame, maximum=len(jobs), style="success.Horizontal.TProgressbar")
+        bar.pack(fill=X, pady=(10, 0))
+        return {"window": top, "tree": tree, "bar": bar}
+
+    def poll_extraction(self, pool, progress):
+        try:
+            while True:
+                job = pool.events.get_nowait()
+                if job.status == "Running": self.log(f"[{job.filename}] Extracting{' selected files' if job.entry_filter else ''}...")
+        except queue.Empty: pass
+        tree = progress["tree"]
+        for job in pool.jobs:
+            elapsed = f"{job.elapsed:.1f}s" if job.started is not None else ""
+            tree.item(job.filename, values=(job.status, elapsed))
+        progress["bar"].config(value=sum(1 for job in pool.jobs if job.status in ("Done", "Failed")))
+        if not pool.done():
+            self.after(100, self.poll_extraction, pool, progress)
+            return
+        progress["window"].destroy()
+        self.active_pool = None
+        self.set_busy(False)
+        self.finish_extraction(pool)
+
+    def finish_extraction(self, pool):
+        failures = pipeline.report_extraction(pool, self.log)
+        if failures:
+            details = "\n".join(f"- {job.filename}: {job.errors[-1] if job.errors else 'unknown error'}" for job in failures)
+            messagebox.showerror("Extraction Failed", f"The following files could not be extracted:\n\n{details}\n\nCheck the log for details.")
+        # Extrações parciais não vão para Extracted_Patches: o empacotamento precisa do patch completo.
+        extracted_patches = pipeline.extracted_patches(pool)
+        if extracted_patches:
+            msg = "You have extracted patch files. Would you like to add them to the dedicated 'Extracted_Patches' folder? They are linked to the extracted files and take no extra space.\n\n" \
+                  "IMPORTANT:\n" \
+                  "- You need 'Patch_0.dx11' for Lua modding.\n" \
+                  f"- For the selected language '{self.language_var.get()}', you need 'Patch_{LANGUAGES[self.language_var.get()]}.dx11' for Images/Data/Root and 'Patch_text0{LANGUAGES[self.language_var.get()]}.dx11' for Text/Message."
+            if messagebox.askyesno("Copy Patches?", msg):
+                pipeline.link_extracted_patches(extracted_patches, self.log, pool.tracer)
+                messagebox.showinfo("Success", "Patches added successfully to Extracted_Patches folder.")
+        pipeline.report_trace(pool.tracer, self.log)
+
+    def get_dynamic_patch_map(self):
+        selected_language_name = self.language_var.get()
+        if not selected_language_name:
+            selected_language_name = "English"
+            self.log("Warning: No language selected, defaulting to English.")
+        return patch_map_for(selected_language_name)
+
+    def pack_mods(self, install=False):
+        if self.busy: return
+        if not self.selected_mods():
+            messagebox.showwarning("No Mods Selected", "Please select at least one mod to pack.")
+            return
+        self.set_busy(True)
+        tracer = Tracer("install" if install else "pack")
+        try:
+            with tracer.span("pack and install" if install else "pack", "run"): self._pack_mods(install, tracer)
+        finally:
+            self.set_busy(False)
+            pipeline.report_trace(tracer, self.log)
+
+    def _pack_mods(self, install, tracer):
+        selected_mods = self.selected_mods()
+        action_string = "Packing and Installing" if install else "Packing"
+        self.log(f"Starting to {action_string.lower()} mods: {', '.join(selected_mods)}")
+
+        language = self.language_var.get() or "English"
+        try:
+            generated_mvgl_files = self.run_task(pipeline.pack_mods, selected_mods, language, self.mod_index, self.log,
+                                                 self.get_pack_backend(), self.get_staging_mode(), self.get_pack_workers(), self.cancel_token, tracer)
+        except pipeline.NothingToPack as e:
+            messagebox.showinfo(e.title, str(e))
+            return
+        except pipeline.PackError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+        if generated_mvgl_files is None: return
+
+        try:
+            if install:
+                self.log("Installing packed files...")
+                self.run_task(pipeline.install_packed, generated_mvgl_files, self.game_path.get(), self.log, tracer)
+                messagebox.showinfo("Success", "Mods were packed and installed successfully!")
+            else:
+                self.log(f"Moving packed files to '{PACKED_DIR}' directory...")
+                os.makedirs(PACKED_DIR, exist_ok=True)
+                self.run_task(pipeline.copy_packed, generated_mvgl_files, PACKED_DIR, self.log, tracer)
+                messagebox.showinfo("Success", f"Mods packed successfully! The .MVGL files are in the '{PACKED_DIR}' folder.")
+
+        except Exception as e:
+            action = "install" if install else "move"
+            messagebox.showerror(f"{action.capitalize()} Failed", f"Could not {action} MVGL files:\n{e}")
+            self.log(f"ERROR during file {action}: {e}")
+
+    def watch_mods(self):
+        if self.busy: return
+        selected_mods = self.selected_mods()
+        if not selected_mods:
+            messagebox.showwarning("No Mods Selected", "Please select at least one mod to watch.")
+            return
+        if not os.path.isdir(os.path.join(self.game_path.get(), "gamedata")):
+            messagebox.showerror("Error", "Game 'gamedata' folder not found.")
+            return
+        self.set_busy(True)
+        tracer = Tracer("watch")
+        self.log("Saved changes to the selected mods are now packed and installed right away. Press Cancel to stop watching.")
+        try:
+            with tracer.span("watch", "run"):
+                self.run_task(watch_mods, selected_mods, self.language_var.get() or "English", self.game_path.get(), self.mod_index, self.log,
+                              self.get_pack_backend(), self.get_staging_mode(), self.get_pack_workers(), self.cancel_token, POLL_INTERVAL, DEBOUNCE_SECONDS, tracer)
+        except OSError as e:
+            messagebox.showerror("Watch Failed", f"Could not watch the mods:\n{e}")
+            self.log(f"ERROR while watching mods: {e}")
+        finally:
+            self.set_busy(False)
+            pipeline.report_trace(tracer, self.log)
+
+    def uninstall_mods(self):
+        if self.busy: return
+        if not os.path.isdir(os.path.join(self.game_path.get(), "gamedata")):
+            messagebox.showerror("Error", "Game 'gamedata' folder not found.")
+            return
+        if not messagebox.askyesno("Uninstall All Mods", "Put back the original game archives that installed mods replaced?"): return
+        self.set_busy(True)
+        tracer = Tracer("uninstall")
+        try:
+            restored = self.run_task(pipeline.uninstall_mods, self.game_path.get(), self.log, tracer)
+            messagebox.showinfo("Success", f"{restored} original archive(s) restored." if restored else "No installed mods were found.")
+        except OSError as e:
+            messagebox.showerror("Uninstall Failed", f"Could not restore the original archives:\n{e}")
+            self.log(f"ERROR during uninstall: {e}")
+        finally:
+            self.set_busy(False)
+            pipeline.report_trace(tracer, self.log)
+
+
+def run():
+    """Open the mod manager window."""
+    if not os.path.exists(TOOLS_EXE_PATH):
+        messagebox.showerror("Tool Not Found", f"The helper tool was not found at the expected location:\n{TOOLS_EXE_PATH}\n\nPlease make sure THL-Tools.exe is included when building the executable.")
+    else:
+        app = ModManagerApp()
+        app.mainloop()
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''): sha.update(chunk)
+    return sha.hexdigest()
+
+
+class FileHashCache:
+    """sha256 of files, remembered by (size, mtime) so unchanged files are only read once.
+
+    The cache is a JSON file mapping absolute paths to [size, mtime_ns, sha256].
+    """
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(cache_file, 'r') as f: self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def digest(self, path, st=None):
+        st = st or os.stat(path)
+        key = self.key(path)
+        cached = self.entries.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns: return cached[2]
+        digest = file_sha256(path)
+        self.entries[key] = [st.st_size, st.st_mtime_ns, digest]
+        self.dirty = True
+        return digest
+
+    def remember(self, path, digest):
+        """Record the digest of a file just written with content whose hash is already known."""
+        st = os.stat(path)
+        self.entries[self.key(path)] = [st.st_size, st.st_mtime_ns, digest]
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty: return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        temp_file = self.cache_file + ".tmp"
+        with open(temp_file, 'w') as f: json.dump(self.entries, f)
+        os.replace(temp_file, self.cache_file)
+        self.dirty = False
@@ -0,0 +1,187 @@
+import errno
+import json
+import os
+import shutil
+
+from hashcache import HASH_CHUNK_SIZE
+from packing import UNSUPPORTED_LINK_ERRORS, format_size
+from tracing import NULL_TRACER
+
+STATE_VERSION = 1
+ORIGINALS_DIR_NAME = "BadModLoader_Originals" # Ao lado de gamedata, no mesmo disco, para hardlinks e renomeações
+
+
+class InstallStats:
+    def __init__(self):
+        self.installed = 0
+        self.unchanged = 0
+        self.backed_up = 0
+        self.bytes_written = 0
+
+    def summary(self):
+        return f"{self.installed} installed ({format_size(self.bytes_written)} written), {self.unchanged} already up to date, {self.backed_up} original(s) backed up"
+
+
+class Installer:
+    """Installs packed archives into the game's gamedata folder and can put the originals back.
+
+    Before an archive is replaced for the first time, the original is kept in
+    BadModLoader_Originals next to gamedata: hardlinked when the filesystem
+    allows, copied otherwise. New archives are written to a temporary file in
+    gamedata and swapped in with os.replace, so the original's data, shared by
+    the hardlink, is never written to and a failed install leaves the old file
+    in place. An archive that is byte-identical to the installed one is skipped.
+    Uninstalling renames the originals back.
+    """
+
+    def __init__(self, game_path, hashes):
+        self.gamedata_path = os.path.join(game_path, "gamedata")
+        self.originals_path = os.path.join(game_path, ORIGINALS_DIR_NAME)
+        self.state_file = os.path.join(self.originals_path, "installed.json")
+        self.hashes = hashes
+        self.installed = {}
+        try:
+            with open(self.state_file, 'r') as f: data = json.load(f)
+            if data.get("version") == STATE_VERSION: self.installed = data.get("installed", {})
+        except (OSError, ValueError, AttributeError):
+            self.installed = {}
+
+    @staticmethod
+    def is_ours(record, digest):
+        """Whether a file with this digest is the one we installed, or were installing when a run stopped."""
+        return record is not None and digest is not None and digest in (record["sha256"], record.get("pending"))
+
+    def target_name(self, filename):
+        """The name the game already uses for filename, whatever its case ('.MVGL' from the packer vs '.mvgl')."""
+        try:
+            for name in os.listdir(self.gamedata_path):
+                if name.lower() == filename.lower(): return name
+        except OSError: pass
+        return filename
+
+    def game_copy(self, filename):
+        """Path of the game's own version of a gamedata file: the kept original when the file there is one we installed.
+
+        Returns None when we installed it and the game has no version of its own.
+        """
+        name = self.target_name(filename)
+        dest_path = os.path.join(self.gamedata_path, name)
+        record = self.installed.get(name.lower())
+        if record is None or not os.path.isfile(dest_path) or not self.is_ours(record, self.hashes.digest(dest_path)): return dest_path
+        backup_path = os.path.join(self.originals_path, name)
+        return backup_path if record["original"] and os.path.isfile(backup_path) else None
+
+    def _save_state(self):
+        os.makedirs(self.originals_path, exist_ok=True)
+        with open(self.state_file + ".tmp", 'w') as f: json.dump({"version": STATE_VERSION, "installed": self.installed}, f, indent=1)
+        os.replace(self.state_file + ".tmp", self.state_file)
+
+    def _back_up(self, name, dest_path):
+        """Keep the file now at dest_path as the original of name; returns False when there was nothing to keep."""
+        if not os.path.exists(dest_path): return False
+        os.makedirs(self.originals_path, exist_ok=True)
+        backup_path = os.path.join(self.originals_path, name)
+        temp_path = backup_path + ".tmp"
+        if os.path.lexists(temp_path): os.remove(temp_path)
+        try:
+            os.link(dest_path, temp_path)
+        except (OSError, AttributeError) as e:
+            if isinstance(e, OSError) and e.errno not in UNSUPPORTED_LINK_ERRORS and e.errno != errno.EMLINK: raise
+            shutil.copy2(dest_path, temp_path)
+        os.replace(temp_path, backup_path)
+        return True
+
+    def _write(self, source_path, dest_path):
+        temp_path = os.path.join(os.path.dirname(dest_path), f".{os.path.basename(dest_path)}.tmp")
+        try:
+            with open(source_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, HASH_CHUNK_SIZE)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(temp_path, dest_path)
+        except BaseException:
+            if os.path.exists(temp_path): os.remove(temp_path)
+            raise
+
+    def install(self, mvgl_files, log, tracer=NULL_TRACER):
+        """Install each packed .MVGL over its game archive and return InstallStats."""
+        stats = InstallStats()
+        try:
+            for mvgl_file in mvgl_files:
+                name = self.target_name(os.path.basename(mvgl_file))
+                dest_path = os.path.join(self.gamedata_path, name)
+                with tracer.span(f"install {name}", "install"):
+                    new_digest = self.hashes.digest(mvgl_file)
+                    current_digest = self.hashes.digest(dest_path) if os.path.isfile(dest_path) else None
+                    record = self.installed.get(name.lower())
+                    if record is not None and record.get("pending") is not None and record["pending"] == current_digest:
+                        # A execução anterior parou depois do os.replace, antes de registrá-lo.
+                        record["sha256"] = record.pop("pending")
+                        self._save_state()
+                    if current_digest == new_digest:
+                        log(f"'{name}' is already installed and unchanged.")
+                        stats.unchanged += 1
+                        continue
+                    # Sem registro, ou se o jogo foi atualizado desde a instalação, o arquivo atual é o original.
+                    # Com sha256 None a primeira instalação não terminou e o original guardado continua valendo.
+                    if record is None or (record["sha256"] is not None and not self.is_ours(record, current_digest)):
+                        had_original = self._back_up(name, dest_path)
+                        if had_original:
+                            stats.backed_up += 1
+                            log(f"Kept the original '{name}' in '{ORIGINALS_DIR_NAME}'.")
+                        record = self.installed[name.lower()] = {"name": name, "sha256": None, "original": had_original}
+                    record["pending"] = new_digest
+                    self._save_state()
+                    self._write(mvgl_file, dest_path)
+                    record["sha256"] = new_digest
+                    del record["pending"]
+                    self._save_state()
+                    self.hashes.remember(dest_path, new_digest)
+                    size = os.path.getsize(dest_path)
+                    stats.installed += 1
+                    stats.bytes_written += size
+                    tracer.count("files installed")
+                    tracer.count("bytes installed", size)
+                    log(f"Installed '{name}' to game folder.")
+        finally:
+            self.hashes.save()
+        return stats
+
+    def uninstall(self, log, tracer=NULL_TRACER, names=None):
+        """Put the originals of names (archive filenames, any case), or of every installed archive, back; returns how many were restored.
+
+        Archives the game did not have are removed.
+        """
+        wanted = None if names is None else {name.lower() for name in names}
+        restored = 0
+        for key, record in list(self.installed.items()):
+            if wanted is not None and key not in wanted: continue
+            name = record["name"]
+            dest_path = os.path.join(self.gamedata_path, name)
+            with tracer.span(f"restore {name}", "install"):
+                current_digest = self.hashes.digest(dest_path) if os.path.isfile(dest_path) else None
+                backup_path = os.path.join(self.originals_path, name)
+                if not self.is_ours(record, current_digest) and record["sha256"] is None:
+                    # A primeira instalação parou antes de substituir o arquivo: ele ainda é o original, igual ao guardado.
+                    if record["original"] and os.path.exists(backup_path):
+                        os.replace(backup_path, dest_path)
+                        if os.path.exists(backup_path): os.remove(backup_path) # Hardlinks do mesmo arquivo: a renomeação não faz nada
+                    log(f"'{name}' was never fully installed; the original is in place.")
+                elif not self.is_ours(record, current_digest):
+                    # O jogo substituiu o arquivo depois da instalação (uma atualização): o arquivo atual fica.
+                    if os.path.exists(backup_path): os.remove(backup_path)
+                    log(f"'{name}' is not the version the mod loader installed; leaving it as it is.")
+                elif record["original"]:
+                    if not os.path.exists(backup_path):
+                        log(f"ERROR: The original '{name}' is missing from '{ORIGINALS_DIR_NAME}'; verify the game files to get it back.")
+                        continue
+                    os.replace(backup_path, dest_path)
+                    log(f"Restored the original '{name}'.")
+                else:
+                    if os.path.exists(dest_path): os.remove(dest_path)
+                    log(f"Removed '{name}', which the game did not have.")
+            del self.installed[key]
+            restored += 1
+        if restored: self._save_state()
+        self.hashes.save()
+        return restored
@@ -0,0 +1,300 @@
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from mvgl import extract_entries
+from packing import keep_base_archive
+from tracing import NULL_TRACER
+
+# CREATE_NO_WINDOW só existe no Windows.
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+DEFAULT_EXTRACT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+MAX_EXTRACT_WORKERS = max(1, os.cpu_count() or 1)
+LOG_BUFFER_LINES = 5000
+
+
+class LogBuffer:
+    """Bounded, thread-safe ring buffer of log lines.
+
+    Producers append from any thread; the GUI drains it at a fixed rate.
+    When it is full the oldest lines are dropped and counted.
+    """
+
+    def __init__(self, maxlen=LOG_BUFFER_LINES):
+        self._lines = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._dropped = 0
+
+    def append(self, line):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen: self._dropped += 1
+            self._lines.append(line)
+
+    def drain(self):
+        """Return (lines, dropped) and empty the buffer."""
+        with self._lock:
+            lines = list(self._lines)
+            dropped = self._dropped
+            self._lines.clear()
+            self._dropped = 0
+        return lines, dropped
+
+
+class Job:
+    """A subprocess running in the background.
+
+    stdout and stderr are drained by two threads at the same time, so a tool
+    that writes a lot to either pipe can never block on it. The last lines of
+    each stream are kept on the job and, if a log callable is given, passed to
+    it from the reader threads.
+    """
+
+    def __init__(self, command, log=None, max_lines=LOG_BUFFER_LINES, log_prefix=""):
+        self.command = command
+        self.log = log
+        self.log_prefix = log_prefix
+        self.output = deque(maxlen=max_lines)
+        self.errors = deque(maxlen=max_lines)
+        self.returncode = None
+        self.cancelled = False
+        self.process = None
+        self._finished = threading.Event()
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        text=True, errors="replace", creationflags=CREATE_NO_WINDOW)
+        readers = [threading.Thread(target=self._drain, args=(self.process.stdout, self.output, ""), daemon=True),
+                   threading.Thread(target=self._drain, args=(self.process.stderr, self.errors, "ERROR: "), daemon=True)]
+        for reader in readers: reader.start()
+        threading.Thread(target=self._reap, args=(readers,), daemon=True).start()
+        return self
+
+    def _drain(self, pipe, lines, prefix):
+        with pipe:
+            for line in pipe:
+                line = line.strip()
+                if not line: continue
+                lines.append(line)
+                if self.log is not None: self.log(self.log_prefix + prefix + line)
+
+    def _reap(self, readers):
+        for reader in readers: reader.join()
+        self.returncode = self.process.wait()
+        self._finished.set()
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def cancel(self):
+        self.cancelled = True
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+
+class CancelToken:
+    """Cancel flag shared by everything one operation runs; cancelling also terminates its running Jobs."""
+
+    def __init__(self):
+        self.cancelled = False
+        self._jobs = set()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            jobs = list(self._jobs)
+        for job in jobs: job.cancel()
+
+    def start(self, job):
+        """Start job and keep track of it; returns False, without starting it, once cancelled."""
+        with self._lock:
+            if self.cancelled: return False
+            self._jobs.add(job.start())
+        return True
+
+    def finish(self, job):
+        with self._lock: self._jobs.discard(job)
+
+
+def run_jobs(commands, max_parallel, log, cancel=None, tracer=NULL_TRACER):
+    """Run (label, command) pairs, up to max_parallel at once, and wait for all of them; returns a success flag for each."""
+    cancel = cancel or CancelToken()
+    results = [False] * len(commands)
+
+    def run(index):
+        label, command = commands[index]
+        if cancel.cancelled: return
+        log(f"[{label}] Executing: {' '.join(command)}")
+        job = Job(command, log, log_prefix=f"[{label}] ")
+        with tracer.span(f"run {os.path.basename(command[0])} {label}", "subprocess"):
+            try:
+                if not cancel.start(job): return
+            except OSError as e:
+                log(f"[{label}] ERROR: Could not run '{command[0]}': {e}")
+                return
+            job.wait()
+            cancel.finish(job)
+        if job.cancelled: log(f"[{label}] Command cancelled.")
+        elif job.returncode != 0: log(f"[{label}] Command failed with return code {job.returncode}")
+        else:
+            log(f"[{label}] Command executed successfully.")
+            results[index] = True
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_parallel)), thread_name_prefix="pack") as executor:
+        list(executor.map(run, range(len(commands))))
+    return results
+
+
+class ExtractionJob:
+    """One archive to extract, with its own status, output and error."""
+
+    def __init__(self, filename, source_path, output_path, entry_filter=None, incremental=False, keep_copy_in=None):
+        self.filename = filename
+        self.source_path = source_path
+        self.output_path = output_path
+        # Com um filtro, só as entradas escolhidas são extraídas, pelo leitor nativo.
+        self.entry_filter = entry_filter
+        self.incremental = incremental
+        # Pasta onde guardar uma cópia do arquivo original depois de extraí-lo.
+        self.keep_copy_in = keep_copy_in
+        self.status = "Queued"
+        self.output = []
+        self.errors = []
+        self.returncode = None
+        self.started = None
+        self.ended = None
+
+    @property
+    def failed(self):
+        return self.status == "Failed"
+
+    @property
+    def finished(self):
+        return self.status in ("Done", "Failed", "Cancelled")
+
+    @property
+    def finished_ok(self):
+        return self.status == "Done"
+
+    @property
+    def elapsed(self):
+        if self.started is None: return 0.0
+        return (self.ended or time.monotonic()) - self.started
+
+
+class ExtractionPool:
+    """Runs 'DSCSToolsCLI --extract', or a selective native extraction, for several archives at once.
+
+    Workers never touch Tk: every status change is put on `events` and
+    the GUI drains it from the main thread. With a BlobStore, each finished
+    tree is moved into it and left as a view of links.
+    """
+
+    def __init__(self, tools_path, jobs, max_workers=DEFAULT_EXTRACT_WORKERS, hashes=None, tracer=NULL_TRACER, store=None):
+        self.tools_path = tools_path
+        self.hashes = hashes
+        self.store = store
+        self.tracer = tracer
+        self.jobs = list(jobs)
+        self.max_workers = max(1, int(max_workers))
+        self.events = queue.Queue()
+        self.cancelled = False
+        self._running = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="extract")
+        for job in self.jobs:
+            self._executor.submit(self._run, job)
+        self._executor.shutdown(wait=False)
+
+    def done(self):
+        return all(job.finished for job in self.jobs)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            running = list(self._running.values())
+        for process_job in running: process_job.cancel()
+
+    def failures(self):
+        return [job for job in self.jobs if job.failed]
+
+    def _run(self, job):
+        with self._lock:
+            if self.cancelled:
+                job.status = "Cancelled"
+                self.events.put(job)
+                return
+            job.status = "Running"
+            job.started = time.monotonic()
+        self.events.put(job)
+        with self.tracer.span(f"extract {job.filename}", "extraction"):
+            status = self._run_selective(job) if job.entry_filter is not None else self._run_tool(job)
+        if status == "Done" and self.store is not None: status = self._store(job)
+        # O status final só muda depois do span, para que done() implique um trace completo.
+        job.ended = time.monotonic()
+        job.status = status
+        self.events.put(job)
+
+    def _run_tool(self, job):
+        try:
+            if os.path.exists(job.output_path): shutil.rmtree(job.output_path)
+            process_job = Job([self.tools_path, "--extract", job.source_path, job.output_path])
+            with self._lock:
+                if self.cancelled: process_job.cancelled = True
+                else: self._running[job.filename] = process_job.start()
+            if process_job.process is not None: process_job.wait()
+            with self._lock: self._running.pop(job.filename, None)
+            job.returncode = process_job.returncode
+            job.output = list(process_job.output)
+            job.errors = list(process_job.errors)
+            if process_job.cancelled: return "Cancelled"
+            if process_job.returncode == 0:
+                if job.keep_copy_in: keep_base_archive(job.source_path, job.keep_copy_in)
+                return "Done"
+            if not job.errors: job.errors.append(f"Command failed with return code {process_job.returncode}")
+        except FileNotFoundError:
+            job.errors.append(f"Command not found. Make sure '{self.tools_path}' exists.")
+        except Exception as e:
+            job.errors.append(f"An unexpected error occurred: {e}")
+        return "Failed"
+
+    def _store(self, job):
+        try:
+            with self.tracer.span(f"store {job.filename}", "extraction"):
+                stats = self.store.ingest(os.path.basename(job.output_path), job.output_path)
+        except OSError as e:
+            job.errors.append(f"Could not store the extracted files: {e}")
+            return "Failed"
+        if stats is None:
+            job.output.append("Store: skipped, this drive does not support hardlinks.")
+            return "Done"
+        job.output.append(f"Store: {stats.summary()}")
+        self.tracer.count("bytes stored", stats.bytes_stored)
+        self.tracer.count("bytes deduplicated", stats.bytes_saved)
+        return "Done"
+
+    def _run_selective(self, job):
+        try:
+            stats = extract_entries(job.source_path, job.output_path, job.entry_filter, job.incremental, self.hashes, lambda: self.cancelled)
+            job.output.append(stats.summary())
+            self.tracer.count("files extracted", stats.written)
+            self.tracer.count("bytes extracted", stats.bytes_written)
+            if job.keep_copy_in and not self.cancelled: keep_base_archive(job.source_path, job.keep_copy_in)
+            job.returncode = 0
+            return "Cancelled" if self.cancelled else "Done"
+        except Exception as e:
+            job.errors.append(str(e))
+            return "Failed"
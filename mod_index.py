@@ -0,0 +1,122 @@
+import json
+import os
+import time
+
+INDEX_VERSION = 2
+MOD_FOLDERS = ("lua", "images", "text", "message", "data", "root")
+# Uma pasta alterada tão perto da varredura pode ter mudado de novo sem mudar o mtime (FAT guarda 2s).
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def route(rel_path, patch_map):
+    """(patch_name, archive_path) that a mod file overrides, or None if it is not in a packed folder.
+
+    'root' goes to the base of the images patch; the other folders keep their name inside their patch.
+    """
+    folder, _, rest = rel_path.partition("/")
+    if not rest: return None
+    if folder == "root": return patch_map["images"], rest
+    if folder in patch_map: return patch_map[folder], rel_path
+    return None
+
+
+def list_mods(mods_dir, load_order=()):
+    """Every mod folder in mods_dir: the ones in load_order first, in that order, then the new ones alphabetically."""
+    mod_names = sorted(d for d in os.listdir(mods_dir) if os.path.isdir(os.path.join(mods_dir, d))) if os.path.isdir(mods_dir) else []
+    return [m for m in load_order if m in mod_names] + [m for m in mod_names if m not in load_order]
+
+
+class ModIndex:
+    """Persistent index of every file under Mods, refreshed incrementally.
+
+    For each mod the index keeps every folder's mtime with its file names,
+    subfolders and when it was listed. A folder whose mtime has not changed is
+    not listed again, so a refresh only stats folders and rescans the ones where
+    files were added, removed or renamed. A folder whose mtime was within
+    RACY_WINDOW_NS of its listing is always listed again, since a change right
+    after the listing may have left the mtime as it was.
+    """
+
+    def __init__(self, index_file, mods_dir):
+        self.index_file = index_file
+        self.mods_dir = mods_dir
+        self.mods = {}
+        self.dirty = False
+        try:
+            with open(index_file, 'r') as f: data = json.load(f)
+            if data.get("version") == INDEX_VERSION: self.mods = data.get("mods", {})
+        except (OSError, ValueError, AttributeError):
+            self.mods = {}
+
+    def refresh(self, mod_names=None):
+        """Bring the index up to date for mod_names (all mods when None); returns how many folders were rescanned."""
+        if mod_names is None:
+            mod_names = list_mods(self.mods_dir)
+            for removed in set(self.mods) - set(mod_names):
+                del self.mods[removed]
+                self.dirty = True
+        rescanned = 0
+        for mod_name in mod_names:
+            mod_path = os.path.join(self.mods_dir, mod_name)
+            if not os.path.isdir(mod_path):
+                if self.mods.pop(mod_name, None) is not None: self.dirty = True
+                continue
+            old_dirs = self.mods.get(mod_name, {})
+            new_dirs = {}
+            stack = [""]
+            while stack:
+                rel_dir = stack.pop()
+                abs_dir = os.path.join(mod_path, rel_dir)
+                try: mtime = os.stat(abs_dir).st_mtime_ns
+                except OSError: continue
+                cached = old_dirs.get(rel_dir)
+                if cached is None or cached["mtime"] != mtime or cached["scanned"] - mtime < RACY_WINDOW_NS:
+                    scanned = time.time_ns() # Antes da listagem: uma mudança durante ela também cai na janela
+                    files, subdirs = [], []
+                    with os.scandir(abs_dir) as it:
+                        for entry in it:
+                            if entry.is_dir(follow_symlinks=False): subdirs.append(entry.name)
+                            elif entry.is_file(): files.append(entry.name)
+                    cached = {"mtime": mtime, "scanned": scanned, "files": sorted(files), "subdirs": sorted(subdirs)}
+                    rescanned += 1
+                    self.dirty = True
+                new_dirs[rel_dir] = cached
+                stack.extend(f"{rel_dir}/{name}" if rel_dir else name for name in cached["subdirs"])
+            if new_dirs.keys() != old_dirs.keys(): self.dirty = True
+            self.mods[mod_name] = new_dirs
+        return rescanned
+
+    def files(self, mod_name):
+        """Yield the relative path ('/' separated) of every indexed file of a mod."""
+        for rel_dir, cached in sorted(self.mods.get(mod_name, {}).items()):
+            for name in cached["files"]:
+                yield f"{rel_dir}/{name}" if rel_dir else name
+
+    def targets(self, mod_names, patch_map):
+        """{(patch_name, lowercased archive path): [(mod_name, rel_path, archive_path), ...]} with mods in the given order."""
+        targets = {}
+        for mod_name in mod_names:
+            for rel_path in self.files(mod_name):
+                routed = route(rel_path, patch_map)
+                if routed is None: continue
+                patch_name, archive_path = routed
+                targets.setdefault((patch_name, archive_path.lower()), []).append((mod_name, rel_path, archive_path))
+        return targets
+
+    def conflicts(self, mod_names, patch_map):
+        """Targets provided by more than one of mod_names; the last provider in load order wins."""
+        return {target: providers for target, providers in self.targets(mod_names, patch_map).items() if len({p[0] for p in providers}) > 1}
+
+    def plan(self, mod_names, patch_map):
+        """The minimal pack: {patch_name: {archive_path: (mod_name, source_path)}}, winners only, patches in first-use order."""
+        plan = {}
+        for (patch_name, _), providers in self.targets(mod_names, patch_map).items():
+            mod_name, rel_path, archive_path = providers[-1]
+            plan.setdefault(patch_name, {})[archive_path] = (mod_name, os.path.join(self.mods_dir, mod_name, *rel_path.split("/")))
+        return plan
+
+    def save(self):
+        if not self.dirty: return
+        with open(self.index_file + ".tmp", 'w') as f: json.dump({"version": INDEX_VERSION, "mods": self.mods}, f)
+        os.replace(self.index_file + ".tmp", self.index_file)
+        self.dirty = False
@@ -0,0 +1,549 @@
+"""Native reader and writer for MVGL (MDB1) archives.
+
+An MVGL file is an MDB1 archive: a header, a file table (a crit-bit tree whose
+entry i is named by name entry i), a name table, a data table and the data.
+Two layouts exist: the original 32-bit one used by Digimon Story Cyber Sleuth,
+and the 64-bit one used by the newer games, The Hundred Line included, whose
+entries are LZ4 block compressed. Entries whose compressed size equals their
+size are stored as-is.
+
+Names are looked up by the game through the file table's crit-bit tree, so the
+writer keeps the base archive's tree untouched unless entries are added.
+"""
+import hashlib
+import io
+import mmap
+import os
+import re
+import struct
+
+try:
+    import lz4.block as lz4_block
+except ImportError: # Sem o pacote lz4, usa o descompressor em Python puro abaixo.
+    lz4_block = None
+
+MDB1_MAGIC = b"MDB1"
+NO_DATA = 0xFFFFFFFF
+COPY_CHUNK_SIZE = 1024 * 1024
+LZ4_LAST_LITERALS = 5
+LZ4_MF_LIMIT = 12
+
+
+class MVGLError(Exception):
+    pass
+
+
+class ArchiveLayout:
+    def __init__(self, name, header_format, file_entry_format, name_format, data_entry_format, name_size, no_data, compression):
+        self.name = name
+        self.header = struct.Struct(header_format)
+        self.file_entry = struct.Struct(file_entry_format)
+        self.name_entry = struct.Struct(name_format)
+        self.data_entry = struct.Struct(data_entry_format)
+        self.name_size = name_size
+        self.no_data = no_data
+        self.compression = compression
+
+    def tables_size(self, file_count, name_count, data_count):
+        return file_count * self.file_entry.size + name_count * self.name_entry.size + data_count * self.data_entry.size
+
+
+LAYOUT_32 = ArchiveLayout("32-bit", "<4sHHIII", "<HHHH", "<4s60s", "<III", 0x3C, 0xFFFF, "doboz")
+LAYOUT_64 = ArchiveLayout("64-bit", "<4sIIIQQ", "<IIII", "<4s124s", "<QQQ", 0x7C, NO_DATA, "lz4")
+LAYOUTS = (LAYOUT_64, LAYOUT_32)
+
+
+def lz4_decompress(data, size):
+    if lz4_block is not None: return lz4_block.decompress(bytes(data), uncompressed_size=size)
+    src = bytes(data)
+    dst = bytearray()
+    i, n = 0, len(src)
+    while i < n:
+        token = src[i]; i += 1
+        literal_length = token >> 4
+        if literal_length == 15:
+            while True:
+                b = src[i]; i += 1
+                literal_length += b
+                if b != 255: break
+        dst += src[i:i + literal_length]; i += literal_length
+        if i >= n: break
+        offset = src[i] | (src[i + 1] << 8); i += 2
+        match_length = token & 15
+        if match_length == 15:
+            while True:
+                b = src[i]; i += 1
+                match_length += b
+                if b != 255: break
+        match_length += 4
+        start = len(dst) - offset
+        if offset <= 0 or start < 0: raise MVGLError("Corrupt LZ4 block.")
+        if offset >= match_length:
+            dst += dst[start:start + match_length]
+        else: # Cópia sobreposta: repete o padrão.
+            while match_length > 0:
+                chunk = dst[start:start + min(offset, match_length)]
+                dst += chunk
+                start += len(chunk)
+                match_length -= len(chunk)
+    if len(dst) != size: raise MVGLError(f"LZ4 block decompressed to {len(dst)} bytes, expected {size}.")
+    return bytes(dst)
+
+
+def _write_lz4_length(out, value):
+    while value >= 255:
+        out.append(255)
+        value -= 255
+    out.append(value)
+
+
+def lz4_compress(data):
+    """LZ4 block (no size prefix). Uses the lz4 package when installed, a greedy pure Python encoder otherwise."""
+    if lz4_block is not None: return lz4_block.compress(bytes(data), store_size=False)
+    data = bytes(data)
+    n = len(data)
+    out = bytearray()
+    table = {}
+    anchor = i = 0
+    while i < n - LZ4_MF_LIMIT:
+        key = data[i:i + 4]
+        ref = table.get(key)
+        table[key] = i
+        if ref is None or i - ref > 0xFFFF:
+            i += 1
+            continue
+        match_length = 4
+        max_length = n - LZ4_LAST_LITERALS - i
+        while match_length < max_length and data[ref + match_length] == data[i + match_length]: match_length += 1
+        literal_length = i - anchor
+        out.append((min(literal_length, 15) << 4) | min(match_length - 4, 15))
+        if literal_length >= 15: _write_lz4_length(out, literal_length - 15)
+        out += data[anchor:i]
+        out += (i - ref).to_bytes(2, "little")
+        if match_length - 4 >= 15: _write_lz4_length(out, match_length - 4 - 15)
+        i += match_length
+        anchor = i
+    literal_length = n - anchor
+    out.append(min(literal_length, 15) << 4)
+    if literal_length >= 15: _write_lz4_length(out, literal_length - 15)
+    out += data[anchor:]
+    return bytes(out)
+
+
+def compress(data, compression):
+    """The bytes to store for data: compressed when that makes it smaller, otherwise data itself."""
+    if compression != "lz4" or not data: return bytes(data)
+    packed = lz4_compress(data)
+    return packed if len(packed) < len(data) else bytes(data)
+
+
+def decompress(data, size, compression):
+    if len(data) == size: return bytes(data)
+    if compression == "lz4": return lz4_decompress(data, size)
+    raise MVGLError(f"{compression} compressed entries are not supported natively. Use DSCSToolsCLI to extract this archive.")
+
+
+def _c_string(raw):
+    return raw.split(b"\0", 1)[0].decode("utf-8", errors="replace")
+
+
+class MVGLEntry:
+    """One file inside an archive. `offset` is absolute; `name` uses '/' separators."""
+
+    def __init__(self, index, name, data_id, offset, size, compressed_size, raw_name, raw_extension):
+        self.index = index
+        self.name = name
+        self.data_id = data_id
+        self.offset = offset
+        self.size = size
+        self.compressed_size = compressed_size
+        self.raw_name = raw_name
+        self.raw_extension = raw_extension
+
+    @property
+    def compressed(self):
+        return self.compressed_size != self.size
+
+    def __repr__(self):
+        return f"MVGLEntry({self.name!r}, size={self.size}, compressed_size={self.compressed_size})"
+
+
+class MVGLReader:
+    """Reads an archive through a memory map; entries are only decompressed when read.
+
+        with MVGLReader(path) as archive:
+            for entry in archive.list(): ...
+            data = archive.read("script/main.lua")
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Arquivo vazio
+            self._file.close()
+            raise MVGLError(f"'{os.path.basename(path)}' is empty.")
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        view = self._map
+        if view[:4] != MDB1_MAGIC:
+            raise MVGLError(f"'{os.path.basename(self.path)}' is not an MDB1 archive (it may be encrypted).")
+        for layout in LAYOUTS:
+            if len(view) < layout.header.size: continue
+            _, file_count, name_count, data_count, data_start, total_size = layout.header.unpack_from(view, 0)
+            if data_start == layout.header.size + layout.tables_size(file_count, name_count, data_count) and data_start <= len(view):
+                break
+        else:
+            raise MVGLError(f"'{os.path.basename(self.path)}' has an unknown MDB1 layout.")
+        self.layout = layout
+        self.data_start = data_start
+        self.total_size = total_size
+        self.file_table = []
+        offset = layout.header.size
+        for i in range(file_count):
+            self.file_table.append(layout.file_entry.unpack_from(view, offset + i * layout.file_entry.size))
+        offset += file_count * layout.file_entry.size
+        self.name_table = []
+        for i in range(name_count):
+            self.name_table.append(layout.name_entry.unpack_from(view, offset + i * layout.name_entry.size))
+        offset += name_count * layout.name_entry.size
+        self.data_table = []
+        for i in range(data_count):
+            self.data_table.append(layout.data_entry.unpack_from(view, offset + i * layout.data_entry.size))
+        self.separator = "\\" if any(b"\\" in raw_name for _, raw_name in self.name_table) else "/"
+        self.entries = []
+        self._by_name = {}
+        for index, (compare_bit, data_id, left, right) in enumerate(self.file_table):
+            if data_id == layout.no_data or index >= len(self.name_table): continue
+            if data_id >= data_count: raise MVGLError(f"Entry {index} points to missing data {data_id}.")
+            raw_extension, raw_name = self.name_table[index]
+            name = _c_string(raw_name).replace("\\", "/")
+            extension = _c_string(raw_extension).strip()
+            if extension: name = f"{name}.{extension}"
+            data_offset, size, compressed_size = self.data_table[data_id]
+            entry = MVGLEntry(index, name, data_id, data_start + data_offset, size, compressed_size, raw_name, raw_extension)
+            if entry.offset + compressed_size > len(view): raise MVGLError(f"'{name}' lies outside the archive.")
+            self.entries.append(entry)
+            self._by_name[name.lower()] = entry
+
+    def close(self):
+        if getattr(self, "_map", None) is not None: self._map.close(); self._map = None
+        if not self._file.closed: self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def list(self):
+        return list(self.entries)
+
+    def stat(self, name):
+        entry = self._by_name.get(name.replace("\\", "/").lower())
+        if entry is None: raise KeyError(name)
+        return entry
+
+    def __contains__(self, name):
+        return name.replace("\\", "/").lower() in self._by_name
+
+    def read_raw(self, entry):
+        """The stored (possibly compressed) bytes of an entry, without copying them."""
+        return memoryview(self._map)[entry.offset:entry.offset + entry.compressed_size]
+
+    def copy_raw(self, offset, size, out):
+        """Stream `size` stored bytes starting at `offset` into the file object `out`, a chunk at a time."""
+        view = memoryview(self._map)
+        try:
+            for start in range(offset, offset + size, COPY_CHUNK_SIZE):
+                out.write(view[start:min(start + COPY_CHUNK_SIZE, offset + size)])
+        finally:
+            view.release()
+
+    def read(self, name):
+        entry = name if isinstance(name, MVGLEntry) else self.stat(name)
+        raw = self.read_raw(entry)
+        try: return decompress(raw, entry.size, self.layout.compression)
+        finally: raw.release()
+
+    def open(self, name):
+        return io.BytesIO(self.read(name))
+
+    def extract(self, name, dest_path):
+        data = self.read(name)
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        if os.path.lexists(dest_path): os.remove(dest_path) # Pode ser um hardlink para o armazenamento de extraídos
+        with open(dest_path, 'wb') as f: f.write(data)
+        return len(data)
+
+
+def glob_to_regex(pattern):
+    """Compile an archive path glob. '**' spans folders, '*' and '?' stay inside one folder; case is ignored."""
+    pattern = pattern.replace("\\", "/").strip("/")
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?"); i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*"); i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*"); i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]"); i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith("!"): body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]"); i = end + 1
+        else:
+            out.append(re.escape(pattern[i])); i += 1
+    return re.compile("".join(out) + r"\Z", re.IGNORECASE)
+
+
+class EntryFilter:
+    """Selects archive paths matching any include pattern and no exclude pattern."""
+
+    def __init__(self, include=("**",), exclude=()):
+        self.include = [glob_to_regex(p) for p in include if p.strip()]
+        self.exclude = [glob_to_regex(p) for p in exclude if p.strip()]
+
+    def __call__(self, name):
+        return any(r.match(name) for r in self.include) and not any(r.match(name) for r in self.exclude)
+
+
+class ExtractStats:
+    def __init__(self):
+        self.matched = 0
+        self.written = 0
+        self.skipped = 0
+        self.bytes_written = 0
+
+    def summary(self):
+        return f"{self.matched} matching file(s): {self.written} written ({self.bytes_written} bytes), {self.skipped} already up to date"
+
+
+def extract_entries(archive_path, output_path, entry_filter, incremental=False, hashes=None, should_stop=None):
+    """Write only the entries accepted by entry_filter under output_path and return ExtractStats.
+
+    With incremental=True an entry is skipped when the file on disk has the same
+    size and sha256 (looked up through `hashes`, a FileHashCache, when given).
+    """
+    stats = ExtractStats()
+    with MVGLReader(archive_path) as archive:
+        for entry in archive.list():
+            if should_stop is not None and should_stop(): break
+            if not entry_filter(entry.name): continue
+            stats.matched += 1
+            dest_path = os.path.join(output_path, *entry.name.split("/"))
+            data = None
+            if incremental and os.path.isfile(dest_path):
+                st = os.stat(dest_path)
+                # Só descomprime para comparar quando o tamanho já bate.
+                if st.st_size == entry.size:
+                    data = archive.read(entry)
+                    on_disk = hashes.digest(dest_path, st) if hashes is not None else None
+                    if on_disk is None:
+                        with open(dest_path, 'rb') as f: on_disk = hashlib.sha256(f.read()).hexdigest()
+                    if on_disk == hashlib.sha256(data).hexdigest():
+                        stats.skipped += 1
+                        continue
+            if data is None: data = archive.read(entry)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            if os.path.lexists(dest_path): os.remove(dest_path)
+            with open(dest_path, 'wb') as f: f.write(data)
+            stats.written += 1
+            stats.bytes_written += len(data)
+    return stats
+
+
+def split_patterns(text):
+    """'lua/**/*.lua, message/*' -> ['lua/**/*.lua', 'message/*']"""
+    return [p for p in re.split(r"[,;\s]+", text or "") if p]
+
+
+# Formas de montar a chave da árvore a partir de (extensão, nome) crus.
+TREE_KEYS = {
+    "raw": lambda extension, name: extension + name,
+    "path": lambda extension, name: name.rstrip(b"\0") + b"." + extension.rstrip(b"\0 "),
+    "name": lambda extension, name: name.rstrip(b"\0"),
+}
+
+
+def _key_bit(key, bit, msb_first):
+    byte = bit >> 3
+    if byte >= len(key): return 0
+    return (key[byte] >> (7 - (bit & 7) if msb_first else bit & 7)) & 1
+
+
+def _first_diff_bit(a, b, msb_first):
+    for byte in range(max(len(a), len(b))):
+        x = (a[byte] if byte < len(a) else 0) ^ (b[byte] if byte < len(b) else 0)
+        if x: return byte * 8 + (8 - x.bit_length() if msb_first else (x & -x).bit_length() - 1)
+    return None
+
+
+class FileTree:
+    """The crit-bit tree stored in the file table. Node 0 is the root; it links to the first real node."""
+
+    def __init__(self, nodes, key_name="raw", msb_first=False):
+        self.nodes = nodes
+        self.key = TREE_KEYS[key_name]
+        self.key_name = key_name
+        self.msb_first = msb_first
+        self.root_link = 3 if nodes[0][2] == 0 and nodes[0][3] != 0 else 2
+
+    def _bit_of(self, index):
+        return -1 if index == 0 else self.nodes[index][0]
+
+    def find(self, key):
+        previous = -1
+        index = self.nodes[0][self.root_link]
+        while True:
+            bit = self._bit_of(index)
+            if bit <= previous: return index
+            previous = bit
+            index = self.nodes[index][3] if _key_bit(key, bit, self.msb_first) else self.nodes[index][2]
+
+    @classmethod
+    def detect(cls, nodes, name_table, entries):
+        """Work out which key and bit order the archive's tree uses, by checking that lookups find known entries."""
+        if len(entries) < 2: return cls(nodes)
+        sample = entries[::max(1, len(entries) // 256)]
+        for key_name in TREE_KEYS:
+            for msb_first in (False, True):
+                tree = cls(nodes, key_name, msb_first)
+                if all(tree.find(tree.key(*name_table[entry.index])) == entry.index for entry in sample): return tree
+        raise MVGLError("The archive's file tree uses an unknown layout, so new files cannot be added to it natively.")
+
+    def rebuild(self, name_table, data_ids):
+        """Build a new tree for every entry of name_table (index 0 is the root) with this key and bit order."""
+        root = list(self.nodes[0])
+        root[2] = root[3] = 0
+        self.nodes = [root]
+        keys = [b""] + [self.key(*name_table[i]) for i in range(1, len(name_table))]
+        for index in range(1, len(name_table)):
+            key = keys[index]
+            closest = self.find(key) if index > 1 else 0
+            crit = _first_diff_bit(key, keys[closest], self.msb_first)
+            if crit is None: raise MVGLError(f"Duplicate file name in archive: {_c_string(name_table[index][1])!r}")
+            parent, child = 0, self.nodes[0][self.root_link]
+            while self._bit_of(parent) < self._bit_of(child) < crit:
+                parent = child
+                child = self.nodes[child][3] if _key_bit(key, self._bit_of(child), self.msb_first) else self.nodes[child][2]
+            if _key_bit(key, crit, self.msb_first): self.nodes.append([crit, data_ids[index], child, index])
+            else: self.nodes.append([crit, data_ids[index], index, child])
+            if parent == 0: self.nodes[0][self.root_link] = index
+            elif _key_bit(key, self._bit_of(parent), self.msb_first): self.nodes[parent][3] = index
+            else: self.nodes[parent][2] = index
+        return self.nodes
+
+
+class WriteStats:
+    def __init__(self):
+        self.entries_copied = 0
+        self.entries_replaced = 0
+        self.entries_added = 0
+        self.bytes_copied = 0
+        self.bytes_encoded = 0
+
+    def summary(self):
+        return (f"{self.entries_copied} entries copied verbatim ({self.bytes_copied} bytes), "
+                f"{self.entries_replaced} replaced, {self.entries_added} added ({self.bytes_encoded} bytes compressed)")
+
+
+def encode_file(source_path, compression):
+    """Default entry encoder: returns (size, stored bytes) for a file on disk."""
+    with open(source_path, 'rb') as f: data = f.read()
+    return len(data), compress(data, compression)
+
+
+def _encode_name(name, layout, separator, extension_pad):
+    folder, _, filename = name.rpartition("/")
+    stem, dot, extension = filename.rpartition(".")
+    if not dot: stem, extension = filename, ""
+    path = f"{folder}/{stem}" if folder else stem
+    raw_name = path.replace("/", separator).encode("utf-8")
+    raw_extension = extension.encode("utf-8")
+    if len(raw_extension) > 4: raise MVGLError(f"'{name}': extensions longer than 4 characters cannot be stored.")
+    if len(raw_name) >= layout.name_size: raise MVGLError(f"'{name}' is too long for this archive.")
+    return raw_extension.ljust(4, extension_pad), raw_name.ljust(layout.name_size, b"\0")
+
+
+def write_archive(base_path, overrides, output_path, encode=encode_file):
+    """Write output_path as base_path with overrides ({archive name: file path}) replaced or added.
+
+    Entries that are not overridden are streamed from the base archive as stored,
+    without being decompressed; only overrides go through `encode`, which returns
+    (size, stored bytes). Memory use does not depend on the archive size.
+    Returns WriteStats.
+    """
+    stats = WriteStats()
+    with MVGLReader(base_path) as base:
+        layout = base.layout
+        file_table = [list(entry) for entry in base.file_table]
+        name_table = list(base.name_table)
+        data_table = list(base.data_table)
+        sources = {}
+        added = []
+        for name, source_path in overrides.items():
+            name = name.replace("\\", "/")
+            if name in base: sources[base.stat(name).data_id] = source_path
+            else: added.append((name, source_path))
+        stats.entries_replaced = len(sources)
+        if added:
+            tree = FileTree.detect(file_table, name_table, base.entries)
+            extension_pad = b" " if any(extension.endswith(b" ") for extension, _ in name_table) else b"\0"
+            for name, source_path in sorted(added):
+                name_table.append(_encode_name(name, layout, base.separator, extension_pad))
+                file_table.append([0, len(data_table), 0, 0])
+                sources[len(data_table)] = source_path
+                data_table.append(None)
+            file_table = tree.rebuild(name_table, [entry[1] for entry in file_table])
+            stats.entries_added = len(added)
+
+        data_start = layout.header.size + layout.tables_size(len(file_table), len(name_table), len(data_table))
+        new_data_table = []
+        temp_path = output_path + ".tmp"
+        with open(temp_path, 'wb') as out:
+            out.seek(data_start)
+            position = 0
+            for data_id, data_entry in enumerate(data_table):
+                source_path = sources.get(data_id)
+                if source_path is None:
+                    offset, size, compressed_size = data_entry
+                    base.copy_raw(base.data_start + offset, compressed_size, out)
+                    stats.entries_copied += 1
+                    stats.bytes_copied += compressed_size
+                else:
+                    size, stored = encode(source_path, layout.compression)
+                    out.write(stored)
+                    compressed_size = len(stored)
+                    stats.bytes_encoded += size
+                new_data_table.append((position, size, compressed_size))
+                position += compressed_size
+            out.seek(0)
+            out.write(layout.header.pack(MDB1_MAGIC, len(file_table), len(name_table), len(new_data_table), data_start, data_start + position))
+            for entry in file_table: out.write(layout.file_entry.pack(*entry))
+            for entry in name_table: out.write(layout.name_entry.pack(*entry))
+            for entry in new_data_table: out.write(layout.data_entry.pack(*entry))
+    os.replace(temp_path, output_path)
+    return stats
+
+
+def create_archive(files, output_path, layout=LAYOUT_64, encode=encode_file):
+    """Write a new archive holding files ({archive name: file path}); returns WriteStats."""
+    base_path = output_path + ".empty"
+    with open(base_path, 'wb') as f:
+        data_start = layout.header.size + layout.tables_size(1, 1, 0)
+        f.write(layout.header.pack(MDB1_MAGIC, 1, 1, 0, data_start, data_start))
+        f.write(layout.file_entry.pack(layout.no_data, layout.no_data, 0, 0))
+        f.write(layout.name_entry.pack(b"\0" * 4, b"\0" * layout.name_size))
+    try: return write_archive(base_path, files, output_path, encode)
+    finally: os.remove(base_path)
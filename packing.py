@@ -0,0 +1,359 @@
+import errno
+import hashlib
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+from hashcache import FileHashCache
+from mvgl import MVGLReader, MVGLError, compress, write_archive
+from tracing import NULL_TRACER
+
+MANIFEST_VERSION = 2
+DEFAULT_PACK_WORKERS = max(1, os.cpu_count() or 1)
+
+STAGING_MODES = ("link", "copy")
+FICLONE = 0x40049409 # ioctl de reflink do Linux (btrfs, xfs, ...)
+# Erros que significam "este sistema de arquivos não suporta", não "falhou".
+# EMLINK não está aqui: é só aquele arquivo que atingiu o limite de links.
+UNSUPPORTED_LINK_ERRORS = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOTTY,
+                           getattr(errno, "EOPNOTSUPP", errno.EINVAL), getattr(errno, "ENOTSUP", errno.EINVAL)}
+
+
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB": break
+        num_bytes /= 1024
+    return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+
+
+class StagingStats:
+    def __init__(self):
+        self.files_reflinked = 0
+        self.files_hardlinked = 0
+        self.files_copied = 0
+        self.bytes_copied = 0
+
+    def summary(self):
+        return f"{self.files_hardlinked} hardlinked, {self.files_reflinked} reflinked, {self.files_copied} copied ({format_size(self.bytes_copied)} copied)"
+
+
+class TreeLinker:
+    """Fills a staging tree with links to the base files instead of byte copies.
+
+    Reflinks are tried first (independent copy-on-write files), then hardlinks,
+    then a real copy. Once the filesystem refuses one kind of link it is not
+    tried again for the rest of the run.
+    """
+
+    def __init__(self, mode="link", stats=None):
+        self.mode = mode
+        self.stats = stats or StagingStats()
+        self.can_reflink = mode == "link" and sys.platform.startswith("linux")
+        self.can_hardlink = mode == "link" and hasattr(os, "link")
+
+    def _reflink(self, src, dst):
+        import fcntl
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+    def link_file(self, src, dst):
+        if self.can_reflink:
+            try:
+                self._reflink(src, dst)
+                shutil.copystat(src, dst)
+                self.stats.files_reflinked += 1
+                return
+            except OSError as e:
+                if os.path.exists(dst): os.remove(dst)
+                if e.errno not in UNSUPPORTED_LINK_ERRORS: raise
+                self.can_reflink = False
+        if self.can_hardlink:
+            try:
+                os.link(src, dst)
+                self.stats.files_hardlinked += 1
+                return
+            except OSError as e:
+                if e.errno != errno.EMLINK:
+                    if e.errno not in UNSUPPORTED_LINK_ERRORS: raise
+                    self.can_hardlink = False
+        self.copy_file(src, dst)
+
+    def copy_file(self, src, dst):
+        # Nunca escreve por cima de um destino existente: ele pode ser um hardlink para o patch base.
+        if os.path.lexists(dst): os.remove(dst)
+        shutil.copy2(src, dst)
+        self.stats.files_copied += 1
+        self.stats.bytes_copied += os.path.getsize(dst)
+
+    def link_tree(self, src_root, dst_root):
+        for dirpath, dirnames, filenames in os.walk(src_root):
+            dst_dir = os.path.join(dst_root, os.path.relpath(dirpath, src_root))
+            os.makedirs(dst_dir, exist_ok=True)
+            for filename in filenames:
+                self.link_file(os.path.join(dirpath, filename), os.path.join(dst_dir, filename))
+
+    def copy_tree(self, src_root, dst_root):
+        for dirpath, dirnames, filenames in os.walk(src_root):
+            dst_dir = os.path.join(dst_root, os.path.relpath(dirpath, src_root))
+            os.makedirs(dst_dir, exist_ok=True)
+            for filename in filenames:
+                self.copy_file(os.path.join(dirpath, filename), os.path.join(dst_dir, filename))
+
+
+def stage_patch(base_patch_path, temp_patch_path, files, mode="link", tracer=NULL_TRACER):
+    """Build temp_patch_path from the base patch plus files ({archive path: (mod, source)}) and return StagingStats.
+
+    In 'link' mode the base files are linked, and only files a mod overrides are
+    materialized as real copies, after unlinking the shared entry.
+    """
+    linker = TreeLinker(mode)
+    patch_name = os.path.basename(temp_patch_path)
+    with tracer.span(f"{mode} base {patch_name}", "staging"):
+        if mode == "link": linker.link_tree(base_patch_path, temp_patch_path)
+        else: linker.copy_tree(base_patch_path, temp_patch_path)
+    by_mod = {}
+    for archive_path, (mod_name, source_path) in files.items():
+        by_mod.setdefault(mod_name, []).append((archive_path, source_path))
+    for mod_name, mod_files in by_mod.items():
+        with tracer.span(f"overlay {mod_name} on {patch_name}", "staging", files=len(mod_files)):
+            for archive_path, source_path in mod_files:
+                dest_path = os.path.join(temp_patch_path, *archive_path.split("/"))
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                linker.copy_file(source_path, dest_path)
+    tracer.count("files linked", linker.stats.files_hardlinked + linker.stats.files_reflinked)
+    tracer.count("files copied", linker.stats.files_copied)
+    tracer.count("bytes copied", linker.stats.bytes_copied)
+    return linker.stats
+
+
+def find_base_archive(base_archives_dir, patch_name):
+    """The pristine .mvgl kept for patch_name, or None."""
+    if not os.path.isdir(base_archives_dir): return None
+    for filename in os.listdir(base_archives_dir):
+        if filename.lower() == f"{patch_name}.mvgl".lower(): return os.path.join(base_archives_dir, filename)
+    return None
+
+
+def keep_base_archive(source_path, base_archives_dir):
+    """Keep a copy of a game archive as it was when it was extracted, for native packing.
+
+    The copy is skipped when the kept one already has the same size and mtime (copy2 keeps the mtime).
+    """
+    os.makedirs(base_archives_dir, exist_ok=True)
+    dest_path = os.path.join(base_archives_dir, os.path.basename(source_path))
+    source_stat = os.stat(source_path)
+    try:
+        dest_stat = os.stat(dest_path)
+        if dest_stat.st_size == source_stat.st_size and dest_stat.st_mtime_ns == source_stat.st_mtime_ns: return dest_path
+    except FileNotFoundError:
+        pass
+    shutil.copy2(source_path, dest_path + ".tmp")
+    os.replace(dest_path + ".tmp", dest_path)
+    return dest_path
+
+
+def walk_files(root):
+    """Yield (relative_path, os.stat_result) for every file under root, in a stable order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            yield os.path.relpath(path, root).replace(os.sep, '/'), os.stat(path)
+
+
+def tree_fingerprint(root):
+    """Cheap version of an extracted tree: a hash of every file's path, size and mtime."""
+    sha = hashlib.sha256()
+    for rel_path, st in walk_files(root):
+        sha.update(f"{rel_path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+    return sha.hexdigest()
+
+
+class PackCache:
+    """Packed .MVGL files kept between runs, one per patch and language, next to the manifest of the inputs that built them.
+
+    A manifest records the base patch version, the tool, the language, the ordered
+    mod list and every packed mod file's size and hash. File mtimes only decide
+    whether a file must be re-hashed, so touching a file without changing it still hits.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hashes = FileHashCache(os.path.join(cache_dir, "file_hashes.json"))
+
+    def build_manifest(self, patch_name, base_path, files, language, tool_path, backend="dscstools"):
+        """files is the patch's plan, {archive path: (mod, source)}; base_path is the extracted
+        base patch folder, or the base .mvgl for the native backend."""
+        tool_stat = os.stat(tool_path) if os.path.exists(tool_path) else None
+        if os.path.isdir(base_path): base_version = tree_fingerprint(base_path)
+        else: base_version = [os.path.getsize(base_path), os.stat(base_path).st_mtime_ns]
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "patch": patch_name,
+            "language": language,
+            "backend": backend,
+            "base": base_version,
+            "tool": [tool_stat.st_size, tool_stat.st_mtime_ns] if tool_stat else None,
+            "mods": list(dict.fromkeys(mod_name for mod_name, source_path in files.values())),
+            "files": [],
+        }
+        for archive_path in sorted(files):
+            mod_name, source_path = files[archive_path]
+            st = os.stat(source_path)
+            manifest["files"].append([archive_path, mod_name, st.st_size, self.hashes.digest(source_path, st)])
+        return manifest
+
+    def _patch_dir(self, patch_name, language):
+        # Uma vaga por idioma: Patch_0 muda com o idioma (japonês põe images e data nele) e não deve expulsar os outros.
+        return os.path.join(self.cache_dir, language, patch_name)
+
+    def _mvgl_path(self, patch_name, language):
+        return os.path.join(self._patch_dir(patch_name, language), f"{patch_name}.MVGL")
+
+    def _manifest_path(self, patch_name, language):
+        return os.path.join(self._patch_dir(patch_name, language), "manifest.json")
+
+    def lookup(self, patch_name, manifest):
+        """Return the cached .MVGL built from exactly these inputs, or None."""
+        mvgl_path = self._mvgl_path(patch_name, manifest["language"])
+        try:
+            with open(self._manifest_path(patch_name, manifest["language"]), 'r') as f: cached_manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached_manifest != manifest or not os.path.isfile(mvgl_path): return None
+        return mvgl_path
+
+    def store(self, patch_name, manifest, mvgl_path):
+        """Move a freshly packed .MVGL into the cache and return its new path."""
+        language = manifest["language"]
+        os.makedirs(self._patch_dir(patch_name, language), exist_ok=True)
+        # A vaga antiga, de antes de uma por idioma, não é mais usada.
+        legacy_dir = os.path.join(self.cache_dir, patch_name)
+        if os.path.isfile(os.path.join(legacy_dir, "manifest.json")): shutil.rmtree(legacy_dir, ignore_errors=True)
+        manifest_path = self._manifest_path(patch_name, language)
+        # Remove o manifesto antigo primeiro, para nunca descrever o arquivo errado.
+        if os.path.exists(manifest_path): os.remove(manifest_path)
+        cached_path = self._mvgl_path(patch_name, language)
+        shutil.move(mvgl_path, cached_path)
+        with open(manifest_path + ".tmp", 'w') as f: json.dump(manifest, f, indent=1)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        return cached_path
+
+    def referenced_digests(self):
+        """sha256 of every mod file some cached .MVGL was built from, in any language."""
+        digests = set()
+        for language in os.listdir(self.cache_dir) if os.path.isdir(self.cache_dir) else []:
+            language_dir = os.path.join(self.cache_dir, language)
+            if not os.path.isdir(language_dir): continue
+            for patch_name in os.listdir(language_dir):
+                try:
+                    with open(os.path.join(language_dir, patch_name, "manifest.json"), 'r') as f: manifest = json.load(f)
+                    digests.update(entry[3] for entry in manifest["files"])
+                except (OSError, ValueError, KeyError, IndexError, TypeError):
+                    continue
+        return digests
+
+    def save(self):
+        self.hashes.save()
+
+
+def _compress_to_file(source_path, blob_path, compression):
+    # Roda nos processos do pool. Um blob vazio significa "guardar sem compressão".
+    with open(source_path, 'rb') as f: data = f.read()
+    stored = compress(data, compression)
+    temp_path = f"{blob_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        if len(stored) < len(data): f.write(stored)
+    os.replace(temp_path, blob_path)
+
+
+class EntryEncoder:
+    """Compresses mod files for the native writer on a process pool, caching the results by content hash.
+
+    prepare() compresses everything up front; encode() only reads finished blobs,
+    so several archives can then be written at the same time.
+    """
+
+    def __init__(self, cache_dir, hashes, workers=DEFAULT_PACK_WORKERS):
+        self.cache_dir = cache_dir
+        self.hashes = hashes
+        self.workers = max(1, int(workers))
+        self.blobs = {}
+        self.compressed = 0
+        self.reused = 0
+
+    def _blob_path(self, digest, compression):
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.{compression}")
+
+    def prepare(self, source_paths, compression):
+        pending = {}
+        for source_path in source_paths:
+            if source_path in self.blobs: continue
+            st = os.stat(source_path)
+            blob_path = self._blob_path(self.hashes.digest(source_path, st), compression)
+            self.blobs[source_path] = (st.st_size, blob_path)
+            if os.path.exists(blob_path): self.reused += 1
+            else: pending.setdefault(blob_path, source_path) # Conteúdo igual só é comprimido uma vez
+        for blob_path in pending: os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        if self.workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as pool:
+                list(pool.map(_compress_to_file, pending.values(), pending.keys(), repeat(compression)))
+        else:
+            for blob_path, source_path in pending.items(): _compress_to_file(source_path, blob_path, compression)
+        self.compressed += len(pending)
+
+    def prune(self, keep_digests):
+        """Delete the compressed entries of content not in keep_digests; returns (entries, bytes) removed."""
+        removed = removed_bytes = 0
+        for rel_path, st in list(walk_files(self.cache_dir)) if os.path.isdir(self.cache_dir) else []:
+            if os.path.basename(rel_path).split(".")[0] in keep_digests: continue
+            os.remove(os.path.join(self.cache_dir, *rel_path.split("/")))
+            removed += 1
+            removed_bytes += st.st_size
+        return removed, removed_bytes
+
+    def encode(self, source_path, compression):
+        size, blob_path = self.blobs[source_path]
+        with open(blob_path, 'rb') as f: stored = f.read()
+        if not stored:
+            with open(source_path, 'rb') as f: stored = f.read()
+            size = len(stored)
+        return size, stored
+
+
+def build_native_patches(builds, encoder, max_parallel=DEFAULT_PACK_WORKERS, tracer=NULL_TRACER):
+    """Write several patch archives at once.
+
+    builds is a list of (patch_name, base_archive, overrides, output_path). Entries
+    are compressed first, then the archives are written in parallel; entry order
+    inside each archive does not depend on timing. Returns {patch_name: WriteStats
+    or the exception that stopped that patch}.
+    """
+    results = {}
+    by_compression = {}
+    for patch_name, base_archive, overrides, output_path in builds:
+        try:
+            with MVGLReader(base_archive) as base: compression = base.layout.compression
+        except (MVGLError, OSError) as e:
+            results[patch_name] = e
+            continue
+        by_compression.setdefault(compression, []).extend(overrides.values())
+    for compression, source_paths in by_compression.items():
+        with tracer.span(f"compress {compression} entries", "pack", files=len(source_paths)):
+            encoder.prepare(source_paths, compression)
+    remaining = [build for build in builds if build[0] not in results]
+    if not remaining: return results
+
+    def write(patch_name, base_archive, overrides, output_path):
+        with tracer.span(f"write {patch_name}", "pack", files=len(overrides)):
+            return write_archive(base_archive, overrides, output_path, encoder.encode)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(remaining))), thread_name_prefix="pack") as pool:
+        futures = {build[0]: pool.submit(write, *build) for build in remaining}
+    for patch_name, future in futures.items():
+        try: results[patch_name] = future.result()
+        except (MVGLError, OSError) as e: results[patch_name] = e
+    return results
@@ -0,0 +1,288 @@
+"""Extraction, packing and installing without any GUI; used by the window and by the command line.
+
+Everything here reports through a `log` callable, which may be called from
+worker threads, and takes paths relative to the working folder like the window does.
+"""
+import os
+import queue
+import re
+import shutil
+
+from blobstore import BlobStore
+from hashcache import FileHashCache
+from installer import Installer
+from jobs import CancelToken, ExtractionJob, ExtractionPool, run_jobs, DEFAULT_EXTRACT_WORKERS
+from mvgl import MVGLError, EntryFilter, split_patterns
+from packing import PackCache, EntryEncoder, stage_patch, find_base_archive, build_native_patches, format_size, STAGING_MODES, DEFAULT_PACK_WORKERS
+from settings import (LANGUAGES, TOOLS_EXE_PATH, EXTRACTED_DIR, EXTRACTED_PATCHES_DIR, EXTRACTED_STORE_DIR, PACKING_TEMP_DIR, PACK_CACHE_DIR,
+                      FILE_HASH_CACHE, INSTALL_HASH_CACHE, COMPRESS_CACHE_DIR, BASE_ARCHIVES_DIR, TRACES_DIR, patch_map_for)
+from tracing import NULL_TRACER
+
+
+class PackError(Exception):
+    """Packing could not be done; `title` is a short heading for the message."""
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+
+
+class NothingToPack(PackError):
+    pass
+
+
+def extraction_jobs(filenames, gamedata_path, filters=None, incremental=True):
+    """An ExtractionJob for each archive in gamedata_path; filters maps a filename to its {"include", "exclude"} patterns.
+
+    Archives the mod loader installed are extracted from the originals it kept,
+    so Extracted and Base_Archives never hold modded files. Raises ValueError,
+    naming the archive, when its patterns are not valid or the game has no
+    version of it.
+    """
+    jobs = []
+    for filename in filenames:
+        source_path = game_archive_path(gamedata_path, filename)
+        if source_path is None:
+            raise ValueError(f"'{filename}' was added by installed mods and is not one of the game's archives.\nUninstall the mods to remove it.")
+        base_name = os.path.splitext(filename)[0]
+        patterns = (filters or {}).get(filename, {})
+        include, exclude = split_patterns(patterns.get("include")), split_patterns(patterns.get("exclude"))
+        if exclude and not include: include = ["**"] # Só exclusões: tudo menos elas
+        try:
+            entry_filter = EntryFilter(include, exclude) if include else None
+        except re.error as e:
+            raise ValueError(f"The patterns for '{filename}' are not valid:\n{e}") from e
+        keep_copy_in = BASE_ARCHIVES_DIR if filename.lower().startswith("patch") else None
+        jobs.append(ExtractionJob(filename, source_path, os.path.join(EXTRACTED_DIR, base_name), entry_filter, incremental, keep_copy_in))
+    return jobs
+
+
+def game_archive_path(gamedata_path, filename):
+    """The game's own version of an archive in gamedata_path: the original kept at install time when mods replaced it.
+
+    Returns None when the archive only exists because mods were installed.
+    """
+    hashes = FileHashCache(INSTALL_HASH_CACHE)
+    try:
+        return Installer(os.path.dirname(os.path.abspath(gamedata_path)), hashes).game_copy(filename)
+    finally:
+        hashes.save()
+
+
+def extraction_pool(jobs, workers=DEFAULT_EXTRACT_WORKERS, tracer=NULL_TRACER):
+    os.makedirs(EXTRACTED_DIR, exist_ok=True)
+    hashes = FileHashCache(FILE_HASH_CACHE)
+    return ExtractionPool(TOOLS_EXE_PATH, jobs, workers, hashes, tracer, BlobStore(EXTRACTED_STORE_DIR, hashes))
+
+
+def run_extraction(pool, log):
+    """Run pool until every job has finished, then report them; returns the failed jobs."""
+    log(f"Extracting {len(pool.jobs)} file(s) with up to {pool.max_workers} parallel job(s)...")
+    pool.start()
+    while not pool.done():
+        try: job = pool.events.get(timeout=0.1)
+        except queue.Empty: continue
+        if job.status == "Running": log(f"[{job.filename}] Extracting{' selected files' if job.entry_filter else ''}...")
+    return report_extraction(pool, log)
+
+
+def report_extraction(pool, log):
+    # Cada arquivo tem seu próprio bloco no log, em vez de saídas misturadas.
+    for job in pool.jobs:
+        log(f"[{job.filename}] {job.status} in {job.elapsed:.1f}s")
+        for line in job.output: log(f"   {line}")
+        for line in job.errors: log(f"   ERROR: {line}")
+    if pool.store is not None and any(job.finished_ok for job in pool.jobs):
+        try:
+            removed, removed_bytes = pool.store.prune()
+            if removed: log(f"Removed {removed} stored file(s) no extracted archive uses any more ({format_size(removed_bytes)}).")
+        except OSError as e:
+            log(f"Could not clean up '{EXTRACTED_STORE_DIR}': {e}")
+    pool.hashes.save()
+    failures = pool.failures()
+    if pool.cancelled: log("Extraction cancelled.")
+    log("Extraction process finished." if not failures else f"Extraction process finished with {len(failures)} failure(s).")
+    return failures
+
+
+def extracted_patches(pool):
+    """Patches the pool extracted completely; partial extractions can't be packed from."""
+    return [os.path.splitext(job.filename)[0] for job in pool.jobs if job.finished_ok and job.entry_filter is None and job.filename.lower().startswith("patch")]
+
+
+def link_extracted_patches(patch_names, log, tracer=NULL_TRACER):
+    """Make EXTRACTED_PATCHES_DIR hold the same files as the extracted patches, as links into the extracted store (copies on drives without hardlinks)."""
+    log("Linking extracted patches...")
+    os.makedirs(EXTRACTED_PATCHES_DIR, exist_ok=True)
+    hashes = FileHashCache(FILE_HASH_CACHE)
+    store = BlobStore(EXTRACTED_STORE_DIR, hashes)
+    try:
+        for patch_name in patch_names:
+            with tracer.span(f"link {patch_name} to {EXTRACTED_PATCHES_DIR}", "extraction"):
+                source_path, dest_path = os.path.join(EXTRACTED_DIR, patch_name), os.path.join(EXTRACTED_PATCHES_DIR, patch_name)
+                # Pastas extraídas antes do armazenamento existir entram nele aqui.
+                if store.manifest(patch_name) is None and store.ingest(patch_name, source_path) is None:
+                    # Sem hardlinks não há armazenamento: uma cópia simples, como antes dele.
+                    if os.path.exists(dest_path): shutil.rmtree(dest_path)
+                    shutil.copytree(source_path, dest_path)
+                    log(f"Copied '{patch_name}' to '{EXTRACTED_PATCHES_DIR}' (this drive does not support hardlinks).")
+                    continue
+                changed, unchanged = store.materialize(patch_name, dest_path)
+            tracer.count("files linked", changed)
+            log(f"Linked '{patch_name}' to '{EXTRACTED_PATCHES_DIR}': {changed} file(s) updated, {unchanged} already up to date.")
+    finally:
+        hashes.save()
+
+
+def pack_mods(mod_names, language, mod_index, log, backend="dscstools", staging_mode=STAGING_MODES[0], workers=DEFAULT_PACK_WORKERS, cancel=None, tracer=NULL_TRACER, patches=None):
+    """Pack mod_names (in load order) for language; returns the packed .MVGL files, in the pack cache, in plan order.
+
+    With patches, a collection of patch names, only those patches are packed.
+
+    Returns None when cancelled. Raises PackError when there is nothing to
+    pack, a base patch is missing or any patch could not be packed.
+    """
+    cancel = cancel or CancelToken()
+    patch_map = patch_map_for(language)
+    log(f"Using language '{language}' (Code: {LANGUAGES[language]})")
+    with tracer.span("index mods", "index", mods=len(mod_names)):
+        rescanned = mod_index.refresh(mod_names)
+        mod_index.save()
+        plan = mod_index.plan(mod_names, patch_map)
+        if patches is not None: plan = {patch_name: files for patch_name, files in plan.items() if patch_name in patches}
+    if rescanned: log(f"Mod index updated ({rescanned} folder(s) rescanned).")
+    for (patch_name, _), providers in sorted(mod_index.conflicts(mod_names, patch_map).items()):
+        if patch_name not in plan: continue
+        log(f"Conflict: '{providers[-1][2]}' is changed by {', '.join(p[0] for p in providers)}; using '{providers[-1][0]}'.")
+
+    if not plan:
+        log("Packing cancelled: No mod content found.")
+        raise NothingToPack("Nothing to Pack", "The selected mods have no content in their subfolders.")
+
+    base_paths = {}
+    for patch_name, files in plan.items():
+        used_mods = list(dict.fromkeys(mod_name for mod_name, source_path in files.values()))
+        log(f"-> '{patch_name}': {len(files)} file(s) from {', '.join(used_mods)}.")
+        base_archive = find_base_archive(BASE_ARCHIVES_DIR, patch_name) if backend == "native" else None
+        if backend == "native" and not base_archive:
+            log(f"No original '{patch_name}' archive in '{BASE_ARCHIVES_DIR}'; it will be packed with DSCSToolsCLI. Extract it once to pack it natively.")
+        base_patch_path = base_archive or os.path.join(EXTRACTED_PATCHES_DIR, patch_name)
+        if not os.path.exists(base_patch_path):
+            log(f"ERROR: Base patch missing: {base_patch_path}")
+            raise PackError("Missing Base Patch", f"The required base patch '{patch_name}' was not found in '{EXTRACTED_PATCHES_DIR}'.\nPlease extract the correct language patches from the game first.")
+        base_paths[patch_name] = base_patch_path
+
+    if os.path.exists(PACKING_TEMP_DIR): shutil.rmtree(PACKING_TEMP_DIR)
+    os.makedirs(PACKING_TEMP_DIR)
+    try:
+        packed = _build_patches(plan, base_paths, language, staging_mode, workers, log, cancel, tracer)
+    finally:
+        shutil.rmtree(PACKING_TEMP_DIR, ignore_errors=True)
+
+    if cancel.cancelled:
+        log("Packing cancelled.")
+        return None
+    # Um conjunto parcial nunca é devolvido: instalá-lo deixaria o jogo com só parte dos mods.
+    failed = [patch_name for patch_name in plan if patch_name not in packed]
+    if failed:
+        raise PackError("Packing Failed", f"Could not pack {', '.join(failed)}; no files were copied or installed. Check the log for errors.")
+    return [packed[patch_name] for patch_name in plan]
+
+
+def _build_patches(plan, base_paths, language, staging_mode, workers, log, cancel, tracer):
+    cache = PackCache(PACK_CACHE_DIR)
+    packed = {}
+    native_builds, tool_builds = [], []
+    for patch_name, files in plan.items():
+        if cancel.cancelled: break
+        base_path = base_paths[patch_name]
+        native = os.path.isfile(base_path)
+        with tracer.span(f"check cache {patch_name}", "cache", files=len(files)):
+            manifest = cache.build_manifest(patch_name, base_path, files, language, TOOLS_EXE_PATH, "native" if native else "dscstools")
+        cached_mvgl = cache.lookup(patch_name, manifest)
+        if cached_mvgl:
+            log(f"'{patch_name}' is unchanged since the last pack. Reusing cached .MVGL.")
+            packed[patch_name] = cached_mvgl
+            continue
+        temp_mvgl_path = os.path.join(PACKING_TEMP_DIR, f"{patch_name}.MVGL")
+        (native_builds if native else tool_builds).append((patch_name, manifest, base_path, files, temp_mvgl_path))
+
+    if native_builds and not cancel.cancelled:
+        log(f"Writing {len(native_builds)} patch archive(s) natively with up to {workers} worker(s)...")
+        encoder = EntryEncoder(COMPRESS_CACHE_DIR, cache.hashes, workers)
+        builds = [(patch_name, base_path, {archive_path: source for archive_path, (mod_name, source) in files.items()}, temp_mvgl_path)
+                  for patch_name, manifest, base_path, files, temp_mvgl_path in native_builds]
+        try:
+            results = build_native_patches(builds, encoder, workers, tracer)
+        except (MVGLError, OSError) as e:
+            results = {build[0]: e for build in builds}
+        log(f"   - Entries: {encoder.compressed} compressed, {encoder.reused} reused from the compression cache.")
+        for patch_name, manifest, base_path, files, temp_mvgl_path in native_builds:
+            result = results[patch_name]
+            if isinstance(result, Exception):
+                log(f"ERROR: Could not write '{patch_name}': {result}")
+                continue
+            log(f"   - '{patch_name}': {result.summary()}.")
+            tracer.count("bytes copied", result.bytes_copied)
+            packed[patch_name] = _store(cache, patch_name, manifest, temp_mvgl_path, tracer)
+        # Cada edição de um mod gera uma entrada nova; só ficam as que algum .MVGL do cache usa.
+        try:
+            removed, removed_bytes = encoder.prune(cache.referenced_digests())
+            if removed: log(f"   - Removed {removed} compressed entries no cached patch uses any more ({format_size(removed_bytes)}).")
+        except OSError as e:
+            log(f"Could not clean up '{COMPRESS_CACHE_DIR}': {e}")
+
+    if tool_builds and not cancel.cancelled:
+        commands = []
+        for patch_name, manifest, base_path, files, temp_mvgl_path in tool_builds:
+            log(f"Staging '{patch_name}'...")
+            temp_patch_path = os.path.join(PACKING_TEMP_DIR, patch_name)
+            stats = stage_patch(base_path, temp_patch_path, files, staging_mode, tracer)
+            log(f"   - Staged '{patch_name}': {stats.summary()}.")
+            commands.append((patch_name, [TOOLS_EXE_PATH, "--pack", temp_patch_path, temp_mvgl_path]))
+        successes = run_jobs(commands, workers, log, cancel, tracer)
+        for (patch_name, manifest, base_path, files, temp_mvgl_path), succeeded in zip(tool_builds, successes):
+            if succeeded: packed[patch_name] = _store(cache, patch_name, manifest, temp_mvgl_path, tracer)
+            shutil.rmtree(os.path.join(PACKING_TEMP_DIR, patch_name))
+    cache.save()
+    return packed
+
+
+def _store(cache, patch_name, manifest, mvgl_path, tracer):
+    with tracer.span(f"store {patch_name}", "cache"):
+        return cache.store(patch_name, manifest, mvgl_path)
+
+
+def copy_packed(mvgl_files, dest_dir, log, tracer=NULL_TRACER):
+    """Copy packed .MVGL files into dest_dir, which must exist (the game's gamedata folder to install them)."""
+    for mvgl_file in mvgl_files:
+        name = os.path.basename(mvgl_file)
+        with tracer.span(f"install {name}", "install"):
+            shutil.copyfile(mvgl_file, os.path.join(dest_dir, name))
+        tracer.count("files installed")
+        tracer.count("bytes installed", os.path.getsize(mvgl_file))
+        log(f"Copied '{name}' to '{dest_dir}'.")
+
+
+def install_packed(mvgl_files, game_path, log, tracer=NULL_TRACER):
+    """Install packed .MVGL files into the game, keeping the originals; returns InstallStats."""
+    stats = Installer(game_path, FileHashCache(INSTALL_HASH_CACHE)).install(mvgl_files, log, tracer)
+    log(f"Install: {stats.summary()}.")
+    return stats
+
+
+def uninstall_mods(game_path, log, tracer=NULL_TRACER, archive_names=None):
+    """Put back the original archives the mod loader replaced, all of them or only archive_names; returns how many were restored."""
+    restored = Installer(game_path, FileHashCache(INSTALL_HASH_CACHE)).uninstall(log, tracer, archive_names)
+    log(f"Uninstall: {restored} archive(s) restored." if restored else "Uninstall: no installed mods to remove.")
+    return restored
+
+
+def report_trace(tracer, log):
+    """Log the run's summary table and save its trace to TRACES_DIR."""
+    log("Timing summary:")
+    for line in tracer.summary(): log(f"   {line}")
+    try:
+        log(f"Trace saved to '{tracer.save(TRACES_DIR)}' (open it in ui.perfetto.dev or chrome://tracing).")
+    except OSError as e:
+        log(f"Could not save the trace: {e}")
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+
+# --- Constants ---
+CONFIG_FILE = "config.json"
+MOD_INDEX_FILE = "mod_index.json"
+MODS_DIR = "Mods"
+EXTRACTED_DIR = "Extracted"
+EXTRACTED_PATCHES_DIR = "Extracted_Patches"
+EXTRACTED_STORE_DIR = "Extracted_Store" # Arquivos extraídos guardados uma vez por conteúdo; as pastas acima são hardlinks para eles
+PACKING_TEMP_DIR = "BadProgrammingModdingStuffHappeningFolder"
+PACKED_DIR = "Packed" # Pasta de destino para a opção "Pack Only"
+PACK_CACHE_DIR = "PackCache" # .MVGL já empacotados, reutilizados se nada mudou
+FILE_HASH_CACHE = os.path.join(PACK_CACHE_DIR, "file_hashes.json")
+INSTALL_HASH_CACHE = os.path.join(PACK_CACHE_DIR, "install_hashes.json") # Hashes dos .mvgl instalados no jogo
+COMPRESS_CACHE_DIR = os.path.join(PACK_CACHE_DIR, "entries") # Entradas já comprimidas, pelo hash do conteúdo
+BASE_ARCHIVES_DIR = "Base_Archives" # Cópias dos Patch .mvgl originais, usadas pelo empacotador nativo
+TRACES_DIR = "Traces" # Tempos de cada fase, no formato Chrome trace
+PACK_BACKENDS = ("dscstools", "native")
+
+LANGUAGES = {
+    "English": "1",
+    "Japanese": "0",
+    "Simplified Chinese": "2",
+    "Traditional Chinese": "3"
+}
+
+# Versão correta para empacotar recursos dentro do .exe principal.
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    try:
+        # PyInstaller cria uma pasta temporária e armazena o caminho em _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+# BADMODLOADER_DSCSTOOLS aponta para outra ferramenta, como o substituto em bench/ para rodar no Linux.
+TOOLS_EXE_PATH = os.environ.get("BADMODLOADER_DSCSTOOLS") or resource_path(os.path.join("THL-Tools", "DSCSToolsCLI.exe"))
+
+
+def patch_map_for(language):
+    """Which patch each mod folder goes into, for a language name from LANGUAGES."""
+    lang_code = LANGUAGES[language]
+    return {"lua": "Patch_0.dx11", "images": f"Patch_{lang_code}.dx11", "data": f"Patch_{lang_code}.dx11", "text": f"Patch_text0{lang_code}.dx11", "message": f"Patch_text0{lang_code}.dx11"}
+
+
+def read_config(config_file=CONFIG_FILE):
+    """The saved settings, or {} when there are none yet; raises ValueError or OSError if the file can't be read."""
+    if not os.path.exists(config_file): return {}
+    with open(config_file, 'r') as f: config = json.load(f)
+    return config if isinstance(config, dict) else {}
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+from hashcache import FileHashCache, file_sha256
+from installer import ORIGINALS_DIR_NAME, Installer
+
+ORIGINAL = b"original archive"
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def game(tmp_path):
+    gamedata_path = tmp_path / "game" / "gamedata"
+    gamedata_path.mkdir(parents=True)
+    (gamedata_path / "Patch_0.dx11.mvgl").write_bytes(ORIGINAL)
+    return tmp_path / "game"
+
+
+def packed(tmp_path, data):
+    path = tmp_path / "packed" / "Patch_0.dx11.MVGL"
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def installer(tmp_path, game):
+    """A new Installer, as a new run of the mod loader would make, reading the state from disk."""
+    return Installer(str(game), FileHashCache(str(tmp_path / "hashes.json")))
+
+
+def crash_write(monkeypatch, after):
+    """Make Installer._write stop the run before os.replace, or after it but before the state is saved."""
+    write = Installer._write
+    def crashing(self, source_path, dest_path):
+        if after: write(self, source_path, dest_path)
+        raise Crash()
+    monkeypatch.setattr(Installer, "_write", crashing)
+
+
+def game_file(game):
+    return (game / "gamedata" / "Patch_0.dx11.mvgl").read_bytes()
+
+
+def test_install_and_uninstall(tmp_path, game):
+    mvgl_file = packed(tmp_path, b"modded")
+    stats = installer(tmp_path, game).install([mvgl_file], print)
+    assert (stats.installed, stats.backed_up) == (1, 1)
+    record = installer(tmp_path, game).installed["patch_0.dx11.mvgl"]
+    assert record["sha256"] == file_sha256(mvgl_file) and "pending" not in record
+    assert game_file(game) == b"modded"
+    assert installer(tmp_path, game).install([mvgl_file], print).unchanged == 1
+    assert installer(tmp_path, game).uninstall(print) == 1
+    assert game_file(game) == ORIGINAL
+    assert not os.path.exists(game / ORIGINALS_DIR_NAME / "Patch_0.dx11.mvgl")
+
+
+@pytest.mark.parametrize("after", [False, True])
+def test_first_install_interrupted(tmp_path, game, monkeypatch, after):
+    mvgl_file = packed(tmp_path, b"modded")
+    crash_write(monkeypatch, after)
+    with pytest.raises(Crash): installer(tmp_path, game).install([mvgl_file], print)
+    monkeypatch.undo()
+    record = installer(tmp_path, game).installed["patch_0.dx11.mvgl"]
+    assert record["sha256"] is None and record["pending"] == file_sha256(mvgl_file)
+    assert game_file(game) == (b"modded" if after else ORIGINAL)
+
+    # A próxima execução termina a instalação sem tomar o arquivo modificado pelo original.
+    stats = installer(tmp_path, game).install([mvgl_file], print)
+    assert (stats.installed, stats.unchanged, stats.backed_up) == ((0, 1, 0) if after else (1, 0, 0))
+    record = installer(tmp_path, game).installed["patch_0.dx11.mvgl"]
+    assert record["sha256"] == file_sha256(mvgl_file) and "pending" not in record
+    assert installer(tmp_path, game).uninstall(print) == 1
+    assert game_file(game) == ORIGINAL
+
+
+@pytest.mark.parametrize("after", [False, True])
+def test_uninstall_after_interrupted_first_install(tmp_path, game, monkeypatch, after):
+    crash_write(monkeypatch, after)
+    with pytest.raises(Crash): installer(tmp_path, game).install([packed(tmp_path, b"modded")], print)
+    monkeypatch.undo()
+    assert installer(tmp_path, game).uninstall(print) == 1
+    assert game_file(game) == ORIGINAL
+
+
+@pytest.mark.parametrize("after", [False, True])
+def test_update_interrupted(tmp_path, game, monkeypatch, after):
+    installer(tmp_path, game).install([packed(tmp_path, b"modded v1")], print)
+    mvgl_file = packed(tmp_path, b"modded v2")
+    crash_write(monkeypatch, after)
+    with pytest.raises(Crash): installer(tmp_path, game).install([mvgl_file], print)
+    monkeypatch.undo()
+    assert game_file(game) == (b"modded v2" if after else b"modded v1")
+
+    # Nenhuma das versões modificadas pode virar o original guardado.
+    assert installer(tmp_path, game).install([mvgl_file], print).backed_up == 0
+    assert game_file(game) == b"modded v2"
+    assert (game / ORIGINALS_DIR_NAME / "Patch_0.dx11.mvgl").read_bytes() == ORIGINAL
+    installer(tmp_path, game).uninstall(print)
+    assert game_file(game) == ORIGINAL
+
+
+@pytest.mark.parametrize("after", [False, True])
+def test_uninstall_after_interrupted_update(tmp_path, game, monkeypatch, after):
+    installer(tmp_path, game).install([packed(tmp_path, b"modded v1")], print)
+    crash_write(monkeypatch, after)
+    with pytest.raises(Crash): installer(tmp_path, game).install([packed(tmp_path, b"modded v2")], print)
+    monkeypatch.undo()
+    # A versão registrada como pendente também é nossa, não uma atualização do jogo a ser mantida.
+    assert installer(tmp_path, game).uninstall(print) == 1
+    assert game_file(game) == ORIGINAL
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+import mvgl
+from mvgl import FileTree, MVGLReader, create_archive, write_archive
+
+
+def sample_data(rng, size):
+    """Repeated text mixed with noise, so LZ4 finds matches of every length."""
+    chunks = []
+    while sum(map(len, chunks)) < size:
+        chunks.append(rng.randbytes(rng.randint(1, 300)) if rng.random() < 0.3 else b"local value = 1\n" * rng.randint(1, 40))
+    return b"".join(chunks)[:size]
+
+
+def write_files(root, files):
+    paths = {}
+    for name, data in files.items():
+        path = root.joinpath(*name.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        paths[name] = str(path)
+    return paths
+
+
+def read_all(archive_path):
+    with MVGLReader(archive_path) as archive:
+        return {entry.name: archive.read(entry.name) for entry in archive.list()}
+
+
+@pytest.fixture
+def pure_lz4(monkeypatch):
+    monkeypatch.setattr(mvgl, "lz4_block", None)
+
+
+@pytest.fixture
+def files():
+    rng = random.Random(1)
+    files = {f"lua/dir{i % 5}/file{i:03d}.lua": sample_data(rng, rng.randint(0, 5000)) for i in range(40)}
+    files["images/ui/title.img"] = bytes(range(256)) * 64
+    files["text/empty.txt"] = b""
+    return files
+
+
+def test_create_then_write_round_trip(tmp_path, files, pure_lz4):
+    base_path, output_path = str(tmp_path / "base.mvgl"), str(tmp_path / "out.mvgl")
+    paths = write_files(tmp_path / "src", files)
+    create_archive(paths, base_path)
+    assert read_all(base_path) == files
+
+    rng = random.Random(2)
+    changed = {"lua/dir0/file000.lua": sample_data(rng, 3000), "lua/new/added.lua": sample_data(rng, 1200), "data/added.bin": rng.randbytes(100)}
+    stats = write_archive(base_path, write_files(tmp_path / "mod", changed), output_path)
+    assert (stats.entries_replaced, stats.entries_added, stats.entries_copied) == (1, 2, len(files) - 1)
+    assert read_all(output_path) == {**files, **changed}
+
+
+def test_file_tree_finds_every_entry_after_adding(tmp_path, files, pure_lz4):
+    base_path, output_path = str(tmp_path / "base.mvgl"), str(tmp_path / "out.mvgl")
+    create_archive(write_files(tmp_path / "src", dict(list(files.items())[:10])), base_path)
+    write_archive(base_path, write_files(tmp_path / "more", dict(list(files.items())[10:])), output_path)
+    with MVGLReader(output_path) as archive:
+        tree = FileTree.detect(archive.file_table, archive.name_table, archive.entries)
+        assert len(archive.entries) == len(files)
+        for entry in archive.entries:
+            assert tree.find(tree.key(*archive.name_table[entry.index])) == entry.index, entry.name
+
+
+@pytest.mark.parametrize("size", [0, 1, 12, 13, 100, 70000])
+def test_pure_lz4_round_trip(size, pure_lz4):
+    data = sample_data(random.Random(size), size)
+    assert mvgl.lz4_decompress(mvgl.lz4_compress(data), size) == data
+
+
+@pytest.mark.parametrize("size", [1, 13, 100, 70000])
+def test_pure_lz4_agrees_with_lz4_package(size, monkeypatch):
+    lz4_block = pytest.importorskip("lz4.block")
+    data = sample_data(random.Random(size), size)
+    monkeypatch.setattr(mvgl, "lz4_block", None)
+    # O que um codifica, o outro decodifica, nos dois sentidos.
+    assert lz4_block.decompress(mvgl.lz4_compress(data), uncompressed_size=size) == data
+    assert mvgl.lz4_decompress(lz4_block.compress(data, store_size=False), size) == data
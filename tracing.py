@@ -0,0 +1,98 @@
+"""Timed spans and counters for one run, saved as a Chrome trace.
+
+Open the saved .json in chrome://tracing or https://ui.perfetto.dev to see
+every phase on a timeline, one row per thread.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+MAX_TRACES = 20 # Traces mais antigas são apagadas
+
+
+class Tracer:
+    """Records spans (a named stretch of time on one thread) and running totals; safe to use from any thread."""
+
+    def __init__(self, name):
+        self.name = name
+        self.events = []
+        self.counters = {}
+        self.threads = {}
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return (time.perf_counter() - self._origin) * 1e6 # Chrome trace usa microssegundos
+
+    @contextmanager
+    def span(self, name, category="phase", **args):
+        start = self._now()
+        try:
+            yield
+        finally:
+            thread = threading.current_thread()
+            event = {"name": name, "cat": category, "ph": "X", "ts": start, "dur": self._now() - start, "pid": os.getpid(), "tid": thread.ident}
+            if args: event["args"] = args
+            with self._lock:
+                self.events.append(event)
+                self.threads.setdefault(thread.ident, thread.name)
+
+    def count(self, name, value=1):
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+            self.events.append({"name": name, "ph": "C", "ts": self._now(), "pid": os.getpid(), "args": {"total": total}})
+
+    def to_json(self):
+        with self._lock:
+            metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": f"BadModLoader {self.name}"}}]
+            metadata += [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}} for tid, name in self.threads.items()]
+            return {"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms", "otherData": {"counters": dict(self.counters)}}
+
+    def save(self, traces_dir):
+        """Write the trace to traces_dir, keeping only the newest MAX_TRACES, and return its path."""
+        os.makedirs(traces_dir, exist_ok=True)
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))}{int(self.started * 1000) % 1000:03d}"
+        path = os.path.join(traces_dir, f"{stamp}-{self.name}.json")
+        suffix = 1
+        while os.path.exists(path): # Duas execuções no mesmo milissegundo
+            suffix += 1
+            path = os.path.join(traces_dir, f"{stamp}-{self.name}-{suffix}.json")
+        with open(path + ".tmp", 'w') as f: json.dump(self.to_json(), f)
+        os.replace(path + ".tmp", path)
+        traces = sorted(name for name in os.listdir(traces_dir) if name.endswith(".json"))
+        for old in traces[:-MAX_TRACES]: os.remove(os.path.join(traces_dir, old))
+        return path
+
+    def summary(self):
+        """Lines of a table with every span's count, total and longest time, slowest first, then the counters."""
+        from packing import format_size
+        totals = {}
+        with self._lock:
+            for event in self.events:
+                if event["ph"] != "X": continue
+                count, total, longest = totals.get(event["name"], (0, 0.0, 0.0))
+                totals[event["name"]] = (count + 1, total + event["dur"], max(longest, event["dur"]))
+            counters = dict(self.counters)
+        width = max([len("Phase")] + [len(name) for name in totals])
+        lines = [f"{'Phase':<{width}}  {'Runs':>5}  {'Total':>9}  {'Longest':>9}"]
+        for name, (count, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<{width}}  {count:>5}  {total / 1e6:>8.2f}s  {longest / 1e6:>8.2f}s")
+        for name, value in sorted(counters.items()):
+            lines.append(f"{name}: {format_size(value) if name.startswith('bytes') else value}")
+        return lines
+
+
+class NullTracer:
+    """Stands in for a Tracer when nothing is being recorded."""
+
+    def span(self, name, category="phase", **args):
+        return nullcontext()
+
+    def count(self, name, value=1):
+        pass
+
+
+NULL_TRACER = NullTracer()
@@ -0,0 +1,116 @@
+"""Watch mode: repack and install only the patches that edited mod files go into.
+
+The selected mods are polled, so it works the same on every system and drive.
+A burst of saves is only acted on once nothing has changed for DEBOUNCE_SECONDS.
+"""
+import os
+import time
+
+import pipeline
+from jobs import CancelToken
+from mod_index import route
+from packing import STAGING_MODES, DEFAULT_PACK_WORKERS
+from settings import MODS_DIR, patch_map_for
+from tracing import NULL_TRACER
+
+POLL_INTERVAL = 0.5
+DEBOUNCE_SECONDS = 1.0 # Editores salvam em várias escritas; espera o arquivo parar de mudar
+
+
+def snapshot(mods_dir, mod_names):
+    """{(mod_name, relative path): (size, mtime_ns)} for every file of mod_names."""
+    files = {}
+    for mod_name in mod_names:
+        mod_path = os.path.join(mods_dir, mod_name)
+        for dirpath, dirnames, filenames in os.walk(mod_path):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try: st = os.stat(path)
+                except OSError: continue # Apagado durante a varredura
+                files[(mod_name, os.path.relpath(path, mod_path).replace(os.sep, '/'))] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+class ModWatcher:
+    """Polls mod folders and reports the patches their changes go into, once the changes have settled.
+
+    Added, removed and modified files all count. Files outside the packed
+    folders (lua, images, data, text, message, root) are ignored.
+    """
+
+    def __init__(self, mods_dir, mod_names, patch_map, debounce=DEBOUNCE_SECONDS):
+        self.mods_dir = mods_dir
+        self.mod_names = list(mod_names)
+        self.patch_map = patch_map
+        self.debounce = debounce
+        self.files = snapshot(mods_dir, self.mod_names)
+        self.pending = {}
+        self.last_change = None
+
+    def poll(self):
+        """Take a new snapshot; returns {patch_name: [changed 'mod/path', ...]} once the changes have settled, else {}."""
+        files = snapshot(self.mods_dir, self.mod_names)
+        changed = [key for key in files.keys() | self.files.keys() if files.get(key) != self.files.get(key)]
+        self.files = files
+        for mod_name, rel_path in changed:
+            routed = route(rel_path, self.patch_map)
+            if routed is None: continue
+            self.pending.setdefault(routed[0], set()).add(f"{mod_name}/{rel_path}")
+            self.last_change = time.monotonic()
+        if not self.pending or time.monotonic() - self.last_change < self.debounce: return {}
+        settled = {patch_name: sorted(paths) for patch_name, paths in self.pending.items()}
+        self.pending = {}
+        return settled
+
+
+def update_patches(mod_names, language, game_path, mod_index, log, patches=None, backend="dscstools", staging_mode=STAGING_MODES[0],
+                   workers=DEFAULT_PACK_WORKERS, cancel=None, tracer=NULL_TRACER):
+    """Pack and install the patches in patches (every patch the mods use when None).
+
+    A patch the mods no longer change gets its original archive back. Errors
+    are logged, not raised, so watching can go on; returns True on success.
+    """
+    started = time.monotonic()
+    patch_map = patch_map_for(language)
+    try:
+        mod_index.refresh(mod_names)
+        mod_index.save()
+        planned = mod_index.plan(mod_names, patch_map)
+        to_pack = [patch_name for patch_name in planned if patches is None or patch_name in patches]
+        emptied = sorted(patch_name for patch_name in patches or () if patch_name not in planned)
+        if to_pack:
+            mvgl_files = pipeline.pack_mods(mod_names, language, mod_index, log, backend, staging_mode, workers, cancel, tracer, to_pack)
+            if mvgl_files is None: return False
+            pipeline.install_packed(mvgl_files, game_path, log, tracer)
+        if emptied:
+            log(f"No selected mod changes {', '.join(emptied)} any more; putting the original back.")
+            pipeline.uninstall_mods(game_path, log, tracer, [f"{patch_name}.mvgl" for patch_name in emptied])
+    except pipeline.PackError as e:
+        log(f"ERROR: {e.title}: {e}")
+        return False
+    except OSError as e:
+        log(f"ERROR: {e}")
+        return False
+    if to_pack or emptied: log(f"Updated {', '.join(to_pack + emptied)} in {time.monotonic() - started:.1f}s.")
+    return True
+
+
+def watch_mods(mod_names, language, game_path, mod_index, log, backend="dscstools", staging_mode=STAGING_MODES[0],
+               workers=DEFAULT_PACK_WORKERS, cancel=None, interval=POLL_INTERVAL, debounce=DEBOUNCE_SECONDS, tracer=NULL_TRACER):
+    """Install mod_names, then keep the game up to date with their edits until cancel is cancelled."""
+    cancel = cancel or CancelToken()
+    settings = (backend, staging_mode, workers, cancel, tracer)
+    watcher = ModWatcher(MODS_DIR, mod_names, patch_map_for(language), debounce)
+    log("Bringing the installed mods up to date...")
+    with tracer.span("update all patches", "watch"):
+        update_patches(mod_names, language, game_path, mod_index, log, None, *settings)
+    log(f"Watching {', '.join(mod_names)} for changes.")
+    while not cancel.cancelled:
+        time.sleep(interval)
+        changes = watcher.poll()
+        for patch_name, paths in changes.items():
+            log(f"Changed for '{patch_name}': {', '.join(paths[:5])}{f' and {len(paths) - 5} more' if len(paths) > 5 else ''}")
+        if changes and not cancel.cancelled:
+            with tracer.span(f"update {', '.join(sorted(changes))}", "watch"):
+                update_patches(mod_names, language, game_path, mod_index, log, set(changes), *settings)
+    log("Stopped watching mods.")